@@ -13,7 +13,8 @@ from .wrappers import (WsgiRequest, Router, HtmlRouter,
 from .templates import register_template_engine, template_engine, Template
 from .cms import CMS
 from .mail import EmailBackend
-from .cache import cached, Cache, register_cache, create_cache
+from .cache import (cached, prefetch_cached, bump_namespace, Cache,
+                    register_cache, create_cache, ResponseCache)
 from .exceptions import raise_http_error, ShellError, http_assert
 from .auth import (
     backend_action, auth_backend_actions, Resource,
@@ -53,9 +54,12 @@ __all__ = [
     'CMS',
     'EmailBackend',
     'cached',
+    'prefetch_cached',
+    'bump_namespace',
     'Cache',
     'register_cache',
     'create_cache',
+    'ResponseCache',
     'raise_http_error',
     'ShellError',
     'http_assert',
@@ -5,6 +5,7 @@ import json
 import asyncio
 import logging
 import threading
+from types import MappingProxyType
 from asyncio import create_subprocess_shell, subprocess
 
 from inspect import isclass
@@ -31,7 +32,8 @@ from .commands import ConfigError
 from .console import ConsoleMixin
 from .extension import LuxExtension, Parameter, EventMixin, app_attribute
 from .wrappers import HeadMeta, LuxContext, formreg
-from .templates import render_data, template_engine, Template
+from .templates import (render_data, template_engine, Template,
+                        TemplateCache)
 from .cms import CMS
 from .models import ModelContainer
 from .cache import create_cache
@@ -84,6 +86,9 @@ class Application(ConsoleMixin, LuxExtension, EventMixin, BackendMixin):
     on_loaded event"""
     cms = None
     """CMS handler"""
+    template_index = None
+    """Dictionary mapping template names to their full path. Built at
+    the ``on_loaded`` event"""
     api = None
     """Handler for Lux API server"""
     _WsgiHandler = WsgiHandler
@@ -169,6 +174,11 @@ class Application(ConsoleMixin, LuxExtension, EventMixin, BackendMixin):
                   'Default formatting for dates in JavaScript', True),
         Parameter('DEFAULT_TEMPLATE_ENGINE', 'jinja2',
                   'Default template engine'),
+        Parameter('TEMPLATE_CACHE_SIZE', 400,
+                  'Maximum number of compiled templates kept in memory'),
+        Parameter('TEMPLATE_BYTECODE_CACHE', None,
+                  ('Optional directory where the bytecode of compiled '
+                   'templates is stored')),
         #
         # Cache
         Parameter('CACHE_SERVER', 'dummy://',
@@ -177,6 +187,25 @@ class Application(ConsoleMixin, LuxExtension, EventMixin, BackendMixin):
                    'supporting the cache protocol')),
         Parameter('CACHE_DEFAULT_TIMEOUT', 60,
                   'Default timeout for data stored in cache'),
+        Parameter('CACHE_CODEC', 'lux.core.cache.Json',
+                  'Dotted path to the codec for values stored in the cache. '
+                  'Available codecs are lux.core.cache.Json, '
+                  'lux.core.cache.Msgpack and lux.core.cache.Pickle.'),
+        Parameter('CACHE_COMPRESSION', None,
+                  'Compression algorithm for large cache values, '
+                  'either zlib or lz4'),
+        Parameter('CACHE_COMPRESSION_THRESHOLD', 4096,
+                  'Cache values larger than this number of bytes are '
+                  'compressed when CACHE_COMPRESSION is set'),
+        Parameter('CACHE_CLEAR_COUNT', 1000,
+                  'Number of keys scanned at each step when clearing a '
+                  'redis cache'),
+        Parameter('CACHE_CLEAR_RATE', 0,
+                  'Maximum number of keys removed per second when clearing '
+                  'a redis cache, 0 for no limit'),
+        Parameter('CACHE_LOCK_TIMEOUT', 10,
+                  'Maximum time in seconds a cached value is locked while '
+                  'being recomputed and other callers wait for it'),
         #
         Parameter('LOCALE', 'en_GB', 'Default locale', True),
         Parameter('DEFAULT_TIMEZONE', 'GMT',
@@ -233,6 +262,7 @@ class Application(ConsoleMixin, LuxExtension, EventMixin, BackendMixin):
         if self._handler is None:
             self.forms = formreg.copy()
             self._handler = _build_handler(self)
+            self.template_index = _build_template_index(self)
             self.fire('on_loaded')
         return self._handler
 
@@ -404,11 +434,19 @@ class Application(ConsoleMixin, LuxExtension, EventMixin, BackendMixin):
         """Return a template filesystem full path or None
 
         Loops through all :attr:`extensions` in reversed order and
-        check for ``name`` within the ``templates`` directory
+        check for ``name`` within the ``templates`` directory.
+        Once the application is loaded, and not in debug mode, names are
+        resolved via the :attr:`template_index` without touching the
+        file system.
         """
         if not isinstance(names, (list, tuple)):
             names = (names,)
+        index = None if self.debug else self.template_index
         for name in names:
+            if index is not None:
+                if name in index:
+                    return index[name]
+                continue
             for ext in reversed(tuple(self.extensions.values())):
                 filename = ext.get_template_full_path(self, name)
                 if filename and os.path.exists(filename):
@@ -426,14 +464,27 @@ class Application(ConsoleMixin, LuxExtension, EventMixin, BackendMixin):
         the :meth:`template_full_path` method.
 
         If the file is not found an empty string is returned.
+
+        Templates are cached by the :attr:`template_cache` and reloaded
+        when changed in debug mode.
         """
         if name:
-            filename = self.template_full_path(name)
-            if filename:
-                with open(filename, 'r') as file:
-                    return Template(file.read())
+            return self.template_cache.get(name)
         return Template()
 
+    def refresh_templates(self):
+        """Rebuild the :attr:`template_index` and clear the
+        :attr:`template_cache`
+        """
+        self.template_index = _build_template_index(self)
+        self.template_cache.clear()
+
+    @lazyproperty
+    def template_cache(self):
+        """The :class:`.TemplateCache` of this application
+        """
+        return TemplateCache(self)
+
     def context(self, request, context=None):
         """Load the ``context`` dictionary for a ``request``.
 
@@ -441,8 +492,10 @@ class Application(ConsoleMixin, LuxExtension, EventMixin, BackendMixin):
         :meth:`render_template` method is used and a the wsgi ``request``
         is passed as key-valued parameter.
 
-        The initial ``context`` is updated with contribution from
-        all :setting:`EXTENSIONS` which expose the ``context`` method.
+        The context is a :class:`.LuxContext` chaining a per-request
+        mapping with the maps of :attr:`context_base`. The per-request
+        mapping is updated with contribution from all :setting:`EXTENSIONS`
+        which expose the ``context`` method.
         """
         if (isinstance(context, LuxContext) or
                 request.cache._in_application_context):
@@ -450,8 +503,7 @@ class Application(ConsoleMixin, LuxExtension, EventMixin, BackendMixin):
         else:
             request.cache._in_application_context = True
             try:
-                ctx = LuxContext()
-                ctx.update(self.config)
+                ctx = LuxContext({}, *self.context_base.maps)
                 ctx.update(self.cms.context(request, ctx))
                 ctx.update(context or ())
                 for ext in self.extensions.values():
@@ -462,6 +514,25 @@ class Application(ConsoleMixin, LuxExtension, EventMixin, BackendMixin):
                 request.cache._in_application_context = False
             return context
 
+    @property
+    def context_base(self):
+        """Base layer of the template context shared by all requests
+
+        A :class:`.LuxContext` chaining static contributions from all
+        :setting:`EXTENSIONS` which expose the ``static_context`` method,
+        built once, in front of the :attr:`config`. Nothing is copied, so
+        changes to the config are visible in templates.
+        """
+        return LuxContext(self._static_context, self.config)
+
+    @lazyproperty
+    def _static_context(self):
+        ctx = LuxContext({}, self.config)
+        for ext in self.extensions.values():
+            if hasattr(ext, 'static_context'):
+                ext.static_context(self, ctx)
+        return MappingProxyType(ctx.maps[0])
+
     def render_template(self, name, context=None,
                         request=None, engine=None, **kw):
         """Render a template file ``name`` with ``context``
@@ -707,6 +778,25 @@ def _build_config(self):
     return config
 
 
+def _build_template_index(self):
+    """Map template names to their full path, extensions loaded later
+    override templates of earlier ones
+    """
+    directories = [os.path.join(LUX_CORE, 'templates')]
+    for ext in self.extensions.values():
+        directories.append(ext.get_template_full_path(self, ''))
+    index = {}
+    for directory in directories:
+        if not directory or not os.path.isdir(directory):
+            continue
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, directory)
+                index[name.replace(os.sep, '/')] = path
+    return index
+
+
 def _build_handler(self):
     engine = self.template_engine('python')
     parameters = self.config.pop('_parameters')
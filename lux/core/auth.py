@@ -1,3 +1,4 @@
+import time
 from functools import partial
 from importlib import import_module
 
@@ -43,7 +44,10 @@ class BackendMixin:
     _config = [
         Parameter('AUTHENTICATION_BACKENDS', [],
                   'List of python dotted paths to classes which provide '
-                  'a backend for authentication.')
+                  'a backend for authentication.'),
+        Parameter('PERMISSIONS_CACHE_TIMEOUT', 60,
+                  'Seconds permissions are cached in a request. It only '
+                  'matters for long lived requests such as websockets')
     ]
 
     def _on_config(self, config):
@@ -113,9 +117,36 @@ class MultiAuthBackend:
         return response
 
     def has_permission(self, request, resource, action):
-        has = self._execute_backend_method('has_permission',
-                                           request, resource, action)
-        return True if has is None else has
+        cache = permissions_cache(request)
+        has = cache.get(resource, action)
+        if has is None:
+            has = self._execute_backend_method('has_permission',
+                                               request, resource, action)
+            has = True if has is None else has
+            cache.set(resource, action, has)
+        return has
+
+    def get_permissions(self, request, resources, actions=None):
+        """Get a dictionary of permissions for ``resources``
+
+        Results are cached in the request, only permissions not already
+        available are requested to the backends, in one call
+        """
+        resources = as_tuple(resources)
+        actions = as_tuple(actions) or tuple(ACTIONS)
+        cache = permissions_cache(request)
+        missing = cache.missing(resources, actions)
+        if missing:
+            perms = self._execute_backend_method('get_permissions', request,
+                                                 missing, actions=actions)
+            cache.update(missing, actions, perms)
+        return cache.permissions(resources, actions)
+
+    def prefetch_permissions(self, request, resources, actions=None):
+        """Load permissions for ``resources`` in one call so that following
+        permission checks during the request are answered from the cache
+        """
+        self.get_permissions(request, resources, actions)
 
     def default_anonymous(self, request):
         return Anonymous()
@@ -143,6 +174,71 @@ class MultiAuthBackend:
             return default(request, *args, **kwargs)
 
 
+class PermissionsCache:
+    """Permissions of a user, keyed by resource and action
+    """
+    def __init__(self, user, timeout=None):
+        self.user = user
+        self.expiry = time.monotonic() + timeout if timeout else None
+        self.data = {}
+
+    def valid(self, user):
+        return self.user is user and (self.expiry is None or
+                                      self.expiry > time.monotonic())
+
+    def get(self, resource, action):
+        return self.data.get(resource, EMPTY_DICT).get(action)
+
+    def set(self, resource, action, has):
+        self.data.setdefault(resource, {})[action] = has
+
+    def missing(self, resources, actions):
+        """Resources with at least one action not in the cache"""
+        data = self.data
+        missing = []
+        for resource in resources:
+            perms = data.get(resource, EMPTY_DICT)
+            if any(action not in perms for action in actions):
+                missing.append(resource)
+        return missing
+
+    def update(self, resources, actions, permissions):
+        """Store ``permissions`` returned by backends. Permissions
+        not returned are stored as ``None`` so that they are not requested
+        again
+        """
+        permissions = permissions or EMPTY_DICT
+        for resource in resources:
+            perms = self.data.setdefault(resource, {})
+            given = permissions.get(resource) or EMPTY_DICT
+            perms.update(given)
+            for action in actions:
+                perms.setdefault(action, None)
+
+    def permissions(self, resources, actions):
+        obj = {}
+        for resource in resources:
+            perms = self.data.get(resource)
+            if perms:
+                perms = dict(((action, perms[action]) for action in actions
+                              if perms.get(action) is not None))
+                if perms:
+                    obj[resource] = perms
+        return obj
+
+
+def permissions_cache(request):
+    """The :class:`.PermissionsCache` of a ``request``
+    """
+    user = request.cache.user
+    cache = request.cache.permissions
+    if cache is None or not cache.valid(user):
+        timeout = request.config['PERMISSIONS_CACHE_TIMEOUT']
+        cache = PermissionsCache(user, timeout)
+        request.cache.permissions = cache
+    return cache
+
+
 class PasswordMixin:
     '''Adds password encryption to an authentication backend.
 
@@ -177,6 +273,15 @@ class PasswordMixin:
                                         self.secret_key,
                                         **self.ckwargs)
 
+    def crypt_needs_rehash(self, encrypted):
+        '''Check if the ``encrypted`` string was created with parameters
+        different from the ones in the :setting:`CRYPT_ALGORITHM` setting
+        '''
+        needs_rehash = getattr(self.crypt_module, 'needs_rehash', None)
+        if needs_rehash:
+            return needs_rehash(to_bytes(encrypted), **self.ckwargs)
+        return False
+
     def decrypt(self, string_or_bytes):
         b = to_bytes(string_or_bytes, self.encoding)
         p = self.crypt_module.decrypt(b, self.secret_key)
@@ -236,16 +341,22 @@ class Resource:
         else:
             return perms
 
+    def resources(self):
+        """List of resource names checked by this :class:`.Resource`,
+        the resource and its fields
+        """
+        resources = [self.resource]
+        for name in self.fields or ():
+            resources.append('%s:%s' % (self.resource, name))
+        return resources
+
     def permissions(self, request):
         """Permissions for this :class:`.Resource`
 
         Return a tuple of fields names or False
         """
         get = request.cache.auth_backend.get_permissions
-        resources = [self.resource]
-        for name in self.fields or ():
-            resources.append('%s:%s' % (self.resource, name))
-        perms = get(request, resources, self.action)
+        perms = get(request, self.resources(), self.action)
         if perms and perms.get(self.resource, EMPTY_DICT).get(self.action):
             return tuple(
                 (
@@ -1,14 +1,25 @@
+import sys
 import json
+import time
+import uuid
+import hmac
+import zlib
+import pickle
+import hashlib
 import logging
 import asyncio
+import threading
 
 from copy import copy
 from inspect import isfunction
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import urlsplit, urlunsplit, urlencode, parse_qsl
 
 from pulsar.utils.slugify import slugify
 from pulsar.apps.data import parse_store_url, create_store
 from pulsar.utils.importer import module_attribute
-from pulsar.utils.string import to_string
+from pulsar.utils.string import to_string, to_bytes
 from pulsar import ImproperlyConfigured, Lock
 
 from .component import AppComponent
@@ -37,6 +48,14 @@ def cached(*args, **kw):
 class Cache(AppComponent):
     """Cache base class
     """
+    single_flight = False
+    """Allow :class:`.CacheObject` to coalesce concurrent misses on
+    a key via the :meth:`lock` method"""
+    persistent = True
+    """Values are stored and can be read back, cache namespaces have
+    a constant generation otherwise"""
+    _codec = None
+
     def __init__(self, app, name, url):
         super().__init__(app)
         self.name = name
@@ -67,31 +86,104 @@ class Cache(AppComponent):
     def hmget(self, key, *fields):
         pass
 
-    def clear(self, prefix=None):
+    def incr(self, key):
+        """Increment the integer value at ``key`` by one
+
+        :return: the new value
+        """
+        value = int(self.get(key) or 0) + 1
+        self.set(key, value)
+        return value
+
+    def get_many(self, keys):
+        """Get the values of several ``keys``
+
+        :return: a list of values, ``None`` for missing keys
+        """
+        return [self.get(key) for key in keys]
+
+    def set_many(self, mapping, timeout=None):
+        """Set several key-value pairs from a ``mapping``
+        """
+        for key, value in mapping.items():
+            self.set(key, value, timeout=timeout)
+
+    def delete_many(self, keys):
+        """Delete several ``keys`` from the cache
+        """
+        return sum((self.delete(key) or 0 for key in keys))
+
+    def clear(self, prefix=None, **options):
+        """Clear keys starting with ``prefix``, by default the
+        :setting:`APP_NAME`.
+
+        Additional ``options`` are backend specific.
+
+        :return: the number of keys removed
+        """
         pass
 
+    @property
+    def codec(self):
+        """The :class:`.CacheCodec` for serialising values, specified by
+        the :setting:`CACHE_CODEC` parameter
+        """
+        if self._codec is None:
+            dotted_path = self.config['CACHE_CODEC']
+            Codec = module_attribute(dotted_path)
+            if not Codec:
+                raise ImproperlyConfigured('Could not load cache codec "%s"'
+                                           % dotted_path)
+            self._codec = Codec(self.app)
+        return self._codec
+
     def set_json(self, key, value, timeout=None):
-        value = json.dumps(value)
+        """Serialise ``value`` with the :attr:`codec` and store it at ``key``
+        """
+        value = self.codec.encode(value)
         self.set(key, value, timeout=timeout)
 
     def get_json(self, key):
-        value = self.get(key)
-        if value is not None:
-            try:
-                return json.loads(to_string(value))
-            except Exception:
-                self.app.logger.warning('Could not convert to JSON: %s',
-                                        value)
+        """Get the value at ``key`` deserialised with the :attr:`codec`
+        """
+        return self._decode(key, self.get(key))
+
+    def set_json_many(self, mapping, timeout=None):
+        """Serialise and store several key-value pairs in one round-trip
+        """
+        encode = self.codec.encode
+        self.set_many(dict(((key, encode(value))
+                            for key, value in mapping.items())),
+                      timeout=timeout)
+
+    def get_json_many(self, keys):
+        """Get and deserialise the values of several ``keys`` in one
+        round-trip
+
+        :return: a list of values, ``None`` for missing keys
+        """
+        return [self._decode(key, value)
+                for key, value in zip(keys, self.get_many(keys))]
 
     def lock(self, name, timeout=None):
         raise NotImplementedError
 
+    def _decode(self, key, value):
+        if value is not None:
+            try:
+                return self.codec.decode(value)
+            except Exception:
+                self.app.logger.warning('Could not decode cache value at %s',
+                                        key)
+
 
 class DummyCache(Cache):
     """A dummy cache to get you started
 
     Not useful to anything really!
     """
+    persistent = False
+
     def __init__(self, app, name, url):
         super().__init__(app, name, url)
         if app.green_pool:
@@ -131,6 +223,9 @@ class GreenLock:
 class RedisCache(Cache):
     """A cache with redis backend
     """
+    single_flight = True
+    unlink_command = 'UNLINK'
+
     def __init__(self, app, name, url):
         super().__init__(app, name, url)
         if app.green_pool:
@@ -152,19 +247,74 @@ class RedisCache(Cache):
         return self._wait(self.client.delete(key))
 
     def hmset(self, key, iterable, timeout=None):
-        self._wait(self.client.hmset(key, iterable, timeout))
+        self._wait(self.client.hmset(key, iterable))
+        if timeout is not None:
+            self._wait(self.client.pexpire(key, int(1000*timeout)))
 
     def hmget(self, key, *fields):
-        return self._wait(self.client.hmset(key, *fields))
+        return self._wait(self.client.hmget(key, *fields))
+
+    def incr(self, key):
+        return self._wait(self.client.execute_command('INCR', key))
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        return self._wait(self.client.mget(*keys))
 
-    def clear(self, prefix=None):
+    def set_many(self, mapping, timeout=None):
+        if timeout is not None:
+            timeout = int(1000*timeout)
+        pipe = self.client.pipeline()
+        for key, value in mapping.items():
+            pipe.set(key, value, px=timeout)
+        execute = getattr(pipe, 'commit', None) or pipe.execute
+        self._wait(execute())
+
+    def delete_many(self, keys):
+        if not keys:
+            return 0
+        return self._wait(self.client.delete(*keys))
+
+    def clear(self, prefix=None, count=None, rate=None, progress=None):
+        """Incrementally remove keys starting with ``prefix``
+
+        Keys are iterated with SCAN and removed in batches with UNLINK
+        (DEL for redis servers older than 4.0) so that the server is never
+        blocked for the whole keyspace walk.
+
+        :param count: SCAN COUNT hint, default to
+            :setting:`CACHE_CLEAR_COUNT`
+        :param rate: optional maximum number of keys removed per second,
+            default to :setting:`CACHE_CLEAR_RATE`
+        :param progress: optional callable invoked with the number of keys
+            removed so far after each batch
+        :return: the number of keys removed
+        """
+        cfg = self.app.config
         if prefix is None:
-            prefix = self.app.config['APP_NAME']
+            prefix = cfg['APP_NAME']
+        count = count or cfg['CACHE_CLEAR_COUNT']
+        rate = rate if rate is not None else cfg['CACHE_CLEAR_RATE']
         pattern = '%s*' % prefix
         self.app.logger.warning('Clearing keys matching %s pattern from %s '
                                 'cache', pattern, self)
-        result = self.client.eval(clear_cache, (), (pattern,))
-        return self._wait(result)
+        total = 0
+        cursor = 0
+        while True:
+            cursor, keys = self._wait(self.client.execute_command(
+                'SCAN', cursor, 'MATCH', pattern, 'COUNT', count))
+            cursor = int(cursor)
+            if keys:
+                start = time.monotonic()
+                total += self._unlink(keys)
+                if progress:
+                    progress(total)
+                if rate:
+                    self._sleep(len(keys)/rate - time.monotonic() + start)
+            if not cursor:
+                break
+        return total
 
     def lock(self, name, **kwargs):
         return GreenLock(self.client.lock(name, **kwargs), self._wait)
@@ -172,20 +322,398 @@ class RedisCache(Cache):
     def _wait(self, value):
         return value
 
+    def _unlink(self, keys):
+        try:
+            return self._wait(
+                self.client.execute_command(self.unlink_command, *keys))
+        except Exception:
+            if self.unlink_command == 'DEL':
+                raise
+            # UNLINK not available, redis < 4.0
+            self.unlink_command = 'DEL'
+            return self._unlink(keys)
+
+    def _sleep(self, seconds):
+        if seconds > 0:
+            if self.app.green_pool:
+                self._wait(asyncio.sleep(seconds))
+            else:
+                time.sleep(seconds)
+
+
+class MemoryCache(DummyCache):
+    """An in-process LRU cache with per-key timeout and a size budget
+
+    The cache is configured via the url query parameters:
+
+    * ``max_entries``: maximum number of keys (default 10000)
+    * ``max_bytes``: maximum size of stored values in bytes, 0 for no limit
+      (default 0)
+
+    When one of the two limits is reached, the least recently used keys
+    are evicted. Hits, misses and evictions are counted and available via
+    the :meth:`stats` method.
+    """
+    single_flight = True
+
+    def __init__(self, app, name, url):
+        super().__init__(app, name, url)
+        _, _, params = parse_store_url(url)
+        self.max_entries = int(params.get('max_entries', 10000))
+        self.max_bytes = int(params.get('max_bytes', 0))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def set(self, key, value, timeout=None):
+        expiry = time.monotonic() + timeout if timeout else None
+        size = _value_size(value)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old:
+                self.bytes -= old[2]
+            if self.max_bytes and size > self.max_bytes:
+                return
+            self._data[key] = (value, expiry, size)
+            self.bytes += size
+            self._evict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expiry, size = entry
+                if expiry is None or expiry > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._data.pop(key)
+                self.bytes -= size
+            self.misses += 1
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry:
+                self.bytes -= entry[2]
+                return 1
+            return 0
+
+    def clear(self, prefix=None, **options):
+        if prefix is None:
+            prefix = self.app.config['APP_NAME']
+        with self._lock:
+            keys = [key for key in self._data if key.startswith(prefix)]
+            for key in keys:
+                self.bytes -= self._data.pop(key)[2]
+        return len(keys)
+
+    def stats(self):
+        """Dictionary of statistics for this cache
+        """
+        return dict(entries=len(self._data),
+                    bytes=self.bytes,
+                    hits=self.hits,
+                    misses=self.misses,
+                    evictions=self.evictions)
+
+    def _evict(self):
+        data = self._data
+        while data and (len(data) > self.max_entries or
+                        (self.max_bytes and self.bytes > self.max_bytes)):
+            _, entry = data.popitem(last=False)
+            self.bytes -= entry[2]
+            self.evictions += 1
+
+
+class TieredCache(Cache):
+    """A :class:`.MemoryCache` in front of a :class:`.RedisCache`
+
+    The url has the same form as the redis url, with ``tiered`` as
+    scheme. Keys are read from the local memory cache first and fall back
+    to redis. Keys are stored in the memory cache for at most
+    ``local_timeout`` seconds (url parameter, default 5).
+
+    When the application has :class:`.LuxChannels` available, keys set,
+    deleted or cleared are invalidated in the memory cache of all other
+    workers via the ``cache`` event on the :setting:`CHANNEL_SERVER` channel.
+    Workers listen to invalidations from their first read or write, without
+    channels keys may be stale for up to ``local_timeout`` seconds.
+    """
+    single_flight = True
+
+    def __init__(self, app, name, url):
+        super().__init__(app, name, url)
+        scheme, netloc, path, query, _ = urlsplit(url)
+        params = dict(parse_qsl(query))
+        local = dict(((k, params.pop(k)) for k in
+                      ('max_entries', 'max_bytes') if k in params))
+        self.local_timeout = float(params.pop('local_timeout', 5))
+        self.local = MemoryCache(app, 'memory',
+                                 'memory://?%s' % urlencode(local))
+        self.remote = RedisCache(
+            app, 'redis',
+            urlunsplit(('redis', netloc, path, urlencode(params), ''))
+        )
+        self.origin = uuid.uuid4().hex
+        self._registered = False
+
+    def ping(self):
+        return self.remote.ping()
+
+    def set(self, key, value, timeout=None):
+        self.remote.set(key, value, timeout=timeout)
+        self.local.set(key, value, timeout=self._local_timeout(timeout))
+        self._invalidate(keys=[key])
+
+    def get(self, key):
+        if not self._registered:
+            self._channels()
+        value = self.local.get(key)
+        if value is None:
+            value = self.remote.get(key)
+            if value is not None:
+                self.local.set(key, value, timeout=self.local_timeout)
+        return value
+
+    def delete(self, key):
+        self.local.delete(key)
+        result = self.remote.delete(key)
+        self._invalidate(keys=[key])
+        return result
+
+    def incr(self, key):
+        self.local.delete(key)
+        result = self.remote.incr(key)
+        self._invalidate(keys=[key])
+        return result
+
+    def get_many(self, keys):
+        if not self._registered:
+            self._channels()
+        values = self.local.get_many(keys)
+        missing = [key for key, value in zip(keys, values) if value is None]
+        if missing:
+            remote = dict(zip(missing, self.remote.get_many(missing)))
+            found = dict(((key, value) for key, value in remote.items()
+                          if value is not None))
+            self.local.set_many(found, timeout=self.local_timeout)
+            values = [remote.get(key) if value is None else value
+                      for key, value in zip(keys, values)]
+        return values
+
+    def set_many(self, mapping, timeout=None):
+        self.remote.set_many(mapping, timeout=timeout)
+        self.local.set_many(mapping, timeout=self._local_timeout(timeout))
+        self._invalidate(keys=list(mapping))
+
+    def delete_many(self, keys):
+        self.local.delete_many(keys)
+        result = self.remote.delete_many(keys)
+        self._invalidate(keys=list(keys))
+        return result
+
+    def clear(self, prefix=None, **options):
+        if prefix is None:
+            prefix = self.app.config['APP_NAME']
+        self.local.clear(prefix)
+        result = self.remote.clear(prefix, **options)
+        self._invalidate(prefix=prefix)
+        return result
+
+    def stats(self):
+        return self.local.stats()
+
+    def lock(self, name, **kwargs):
+        return self.remote.lock(name, **kwargs)
+
+    # INTERNALS
+    def _local_timeout(self, timeout):
+        if timeout:
+            return min(timeout, self.local_timeout)
+        return self.local_timeout
+
+    def _channels(self):
+        """Channels for invalidation messages, available only
+        when running in a green worker
+        """
+        channels = self.app.channels
+        pool = self.app.green_pool
+        if channels is not None and pool and pool.in_green_worker:
+            if not self._registered:
+                self._registered = True
+                channels.register(self.app.config['CHANNEL_SERVER'], 'cache',
+                                  self._on_invalidate)
+            return channels
+
+    def _invalidate(self, **data):
+        channels = self._channels()
+        if channels is not None:
+            data['origin'] = self.origin
+            try:
+                channels.publish(self.app.config['CHANNEL_SERVER'], 'cache',
+                                 data)
+            except Exception:
+                logger.exception('Could not publish cache invalidation')
+
+    def _on_invalidate(self, channel, event, data):
+        if not isinstance(data, dict) or data.get('origin') == self.origin:
+            return
+        if data.get('prefix') is not None:
+            self.local.clear(data['prefix'])
+        for key in data.get('keys') or ():
+            self.local.delete(key)
+
+
+class CacheCodec(AppComponent):
+    """Serialise values stored in the cache by :meth:`.Cache.set_json`
+
+    Encoded values are bytes prefixed by a header byte which identifies the
+    codec and the compression algorithm. Values without a valid header
+    are decoded as JSON strings, so that entries stored by previous
+    versions can still be read.
+
+    Values larger than :setting:`CACHE_COMPRESSION_THRESHOLD` bytes are
+    compressed with the :setting:`CACHE_COMPRESSION` algorithm.
+    """
+    header = None
+
+    def __init__(self, app):
+        super().__init__(app)
+        name = app.config['CACHE_COMPRESSION']
+        self.compression = _compression(name) if name else None
+        self.threshold = app.config['CACHE_COMPRESSION_THRESHOLD'] or 0
+
+    def dumps(self, value):
+        raise NotImplementedError
+
+    def loads(self, data):
+        raise NotImplementedError
+
+    def encode(self, value):
+        data = self.dumps(value)
+        header = self.header
+        if self.compression and len(data) > self.threshold:
+            flag, compress, _ = self.compression
+            data = compress(data)
+            header |= flag
+        return bytes((header,)) + data
+
+    def decode(self, value):
+        value = to_bytes(value)
+        header = value[0] if value else None
+        if header not in HEADERS:
+            return json.loads(to_string(value))
+        data = value[1:]
+        flag = header & COMPRESSION_MASK
+        if flag:
+            data = _compression(COMPRESSION_FLAGS[flag])[2](data)
+        header = header & ~COMPRESSION_MASK
+        if header == self.header:
+            return self.loads(data)
+        elif header == Json.header:
+            return Json.loads(self, data)
+        raise ValueError('Cannot decode cache value with header %s' % header)
+
+
+class Json(CacheCodec):
+    """Default JSON codec
+    """
+    header = 1
+
+    def dumps(self, value):
+        return json.dumps(value).encode('utf-8')
+
+    def loads(self, data):
+        return json.loads(data.decode('utf-8'))
+
+
+class Msgpack(CacheCodec):
+    """Codec using msgpack, requires the ``msgpack`` package
+    """
+    header = 2
+
+    def __init__(self, app):
+        super().__init__(app)
+        try:
+            import msgpack
+        except ImportError:
+            raise ImproperlyConfigured(
+                'Msgpack cache codec requires msgpack: pip install msgpack'
+            ) from None
+        self.msgpack = msgpack
+
+    def dumps(self, value):
+        return self.msgpack.packb(value, use_bin_type=True)
+
+    def loads(self, data):
+        return self.msgpack.unpackb(data, raw=False)
+
+
+class Pickle(CacheCodec):
+    """Codec using pickle
+
+    Values are signed with the application :setting:`SECRET_KEY` and
+    rejected if the signature does not match.
+    """
+    header = 3
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.key = to_bytes(app.config['SECRET_KEY'])
+
+    def dumps(self, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        return self.sign(data) + data
+
+    def loads(self, data):
+        signature, data = data[:32], data[32:]
+        if not hmac.compare_digest(signature, self.sign(data)):
+            raise ValueError('Bad signature for pickled cache value')
+        return pickle.loads(data)
+
+    def sign(self, data):
+        return hmac.new(self.key, data, hashlib.sha256).digest()
+
 
 class CacheObject:
     """Object which implement cache functionality on callables.
 
-    A callable can be either a method or a function
+    A callable can be either a method or a function.
+
+    Concurrent misses on the same key are coalesced when the cache server
+    supports it (:attr:`.Cache.single_flight`): one caller acquires the
+    cache :meth:`~.Cache.lock` and recomputes the value while the others
+    wait for it and read the result from the cache.
+
+    When ``stale`` is given (seconds or a config parameter name), values are
+    kept in the cache for an additional ``stale`` seconds after they expire
+    and served while a single caller refreshes them.
+
+    ``namespace`` is an optional string, a callable returning a string
+    when invoked with the first argument of the cached callable, or a list
+    of those. The cache key embeds the current generation of each
+    namespace so that all keys in a namespace are invalidated at once
+    via :func:`bump_namespace`.
     """
     instance = None
     callable = None
 
-    def __init__(self, user=False, timeout=None, key=None, app=None):
+    def __init__(self, user=False, timeout=None, key=None, app=None,
+                 stale=None, single_flight=True, namespace=None):
         self.user = user
         self.timeout = timeout
         self.key = key
         self.app = app
+        self.stale = stale
+        self.single_flight = single_flight
+        self.namespace = namespace
 
     def cache_key(self, arg):
         key = self.key or ''
@@ -202,7 +730,20 @@ class CacheObject:
             base = '%s-%s' % (type(self.instance).__name__, base)
 
         base = '%s-%s' % (app.config['APP_NAME'], base)
-        return slugify('%s-%s' % (base, key) if key else base)
+        key = slugify('%s-%s' % (base, key) if key else base)
+        for namespace in self.namespaces(arg):
+            key = '%s-%d' % (key, namespace_generation(arg, namespace))
+        return key
+
+    def namespaces(self, arg):
+        """List of namespaces for the first argument ``arg``
+        """
+        namespaces = self.namespace
+        if not namespaces:
+            return ()
+        if not isinstance(namespaces, (list, tuple)):
+            namespaces = (namespaces,)
+        return [n(arg) if hasattr(n, '__call__') else n for n in namespaces]
 
     def __call__(self, *args, **kw):
         if self.callable is None:
@@ -226,44 +767,340 @@ class CacheObject:
                                  'parameter nor from bound instance. '
                                  'Cannot use cache.')
 
-        if arg:
-            key = self.cache_key(arg)
-            result = arg.app.cache_server.get_json(key)
-            if result is not None:
-                return result
-
         if self.instance:
             args = (self.instance,) + args
 
-        result = self.callable(*args, **kw)
+        if not arg:
+            return self.callable(*args, **kw)
+
+        app = arg.app
+        key = self.cache_key(arg)
+        stale = self._seconds(app, self.stale, 0)
+        result, fresh = self._get(app, key, stale, arg)
+        if fresh:
+            return result
+
+        lock = self._lock(app, key, blocking=result is None)
+        if lock is None:
+            return self._set(app, key, stale, self.callable(*args, **kw))
+
+        try:
+            acquired = lock.acquire()
+        except Exception:
+            app.logger.exception('Could not acquire cache lock for %s', key)
+            acquired = False
+
+        if not acquired:
+            # a stale value is available or the lock timed out
+            if result is None:
+                result = self.callable(*args, **kw)
+            return result
+
+        try:
+            result, fresh = self._get(app, key, stale)
+            if not fresh:
+                result = self._set(app, key, stale,
+                                   self.callable(*args, **kw))
+            return result
+        finally:
+            lock.release()
+
+    def __get__(self, instance, objtype):
+        obj = copy(self)
+        obj.instance = instance
+        return obj
+
+    # INTERNALS
+    def _seconds(self, app, value, default):
+        """Seconds given by ``value``, a number or a config parameter
+        name, ``default`` when ``value`` is not a number
+        """
+        if isinstance(value, str) and value in app.config:
+            value = app.config[value]
+        if isinstance(value, (int, float)):
+            return value
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+
+    def _get(self, app, key, stale, arg=None):
+        """Return a two elements tuple, the cached value (or None) and
+        a flag indicating if the value is fresh
+        """
+        result = None
+        if hasattr(arg, 'environ') and arg.cache.cache_prefetch:
+            result = arg.cache.cache_prefetch.pop(key, None)
+        if result is None:
+            result = app.cache_server.get_json(key)
+        return self._unwrap(result, stale)
+
+    def _unwrap(self, result, stale):
+        if result is None:
+            return None, False
+        if not stale:
+            return result, True
+        try:
+            return result['value'], result['expiry'] > time.time()
+        except Exception:
+            return None, False
+
+    def _set(self, app, key, stale, result):
+        timeout = self._seconds(app, self.timeout,
+                                app.config['CACHE_DEFAULT_TIMEOUT'])
+        if timeout:
+            value = result
+            if stale:
+                value = dict(value=result, expiry=time.time() + timeout)
+                timeout += stale
+            try:
+                app.cache_server.set_json(key, value, timeout=timeout)
+            except TypeError:
+                app.logger.exception(
+                    'Could not convert to JSON a value to set in cache')
+            except Exception:
+                app.logger.exception('Critical error while setting cache')
+        return result
 
-        if arg:
-            timeout = self.timeout
-            app = arg.app
-            config = app.config
+    def _lock(self, app, key, blocking=True):
+        cache = app.cache_server
+        pool = app.green_pool
+        if not self.single_flight or not cache.single_flight:
+            return
+        if not pool or not pool.in_green_worker:
+            return
+        timeout = app.config['CACHE_LOCK_TIMEOUT']
+        try:
+            return cache.lock('%s:lock' % key, timeout=timeout,
+                              blocking=timeout if blocking else False)
+        except NotImplementedError:
+            return
+
+
+class ResponseCache:
+    """Cache full responses of a :class:`.JsonRouter` in the cache server
+
+    Set it as the ``response_cache`` attribute of a router::
+
+        class Home(HtmlRouter):
+            response_cache = ResponseCache(timeout=300)
+
+    Successful ``GET`` and ``HEAD`` responses are stored in the cache
+    with a strong ``ETag`` and a ``Last-Modified`` header. The cache key
+    varies with the path, the query string (including ``template=ui``), the
+    response content type and, when ``user`` is ``True``, the user.
+    When ``user`` is ``False`` only anonymous requests are cached.
+    HTML responses of requests with a session are never cached since
+    they embed a CSRF token bound to the session, and neither are
+    responses setting cookies.
+
+    Conditional requests (``If-None-Match`` and ``If-Modified-Since``)
+    matching a cached response are answered with a ``304`` before the
+    router handler is invoked.
+
+    :param timeout: seconds or a config parameter name, default to
+        :setting:`CACHE_DEFAULT_TIMEOUT`
+    :param namespace: optional cache namespace as in :class:`.CacheObject`
+    """
+    stored_headers = ('cache-control', 'vary', 'content-language',
+                      'content-disposition')
+
+    def __init__(self, timeout=None, user=False, namespace=None):
+        self.timeout = timeout
+        self.user = user
+        self.namespace = namespace
+
+    def __call__(self, handler, request):
+        if not self.cacheable(request):
+            return handler(request)
+        cache = request.cache_server
+        key = self.cache_key(request)
+        entry = cache.get_json(key)
+        if entry:
+            return self.cached_response(request, entry)
+        response = handler(request)
+        entry = self.store(request, response, key)
+        if entry and not self.modified(request, entry):
+            return self.not_modified(response, entry)
+        return response
+
+    def cacheable(self, request):
+        """Check if the response to ``request`` can be cached
+        """
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        user = request.cache.user
+        if not self.user and user and user.is_authenticated():
+            return False
+        content_type = request.response.content_type or ''
+        if request.cache.session and 'html' in content_type:
+            return False
+        return True
 
-            if timeout in config:
-                timeout = config[timeout]
+    def cache_key(self, request):
+        query = request.get('QUERY_STRING') or ''
+        bits = [request.path,
+                '&'.join(sorted(query.split('&'))),
+                request.response.content_type or '']
+        if self.user:
+            bits.append(str(request.cache.user))
+        namespaces = CacheObject(namespace=self.namespace).namespaces(request)
+        for namespace in namespaces:
+            bits.append(str(namespace_generation(request, namespace)))
+        digest = hashlib.sha1('\n'.join(bits).encode('utf-8')).hexdigest()
+        return '%s:response:%s' % (request.config['APP_NAME'], digest)
+
+    def store(self, request, response, key):
+        """Store a ``response`` in the cache and add the ``ETag`` and
+        ``Last-Modified`` headers
+        """
+        content = response.content
+        if (response.status_code != 200 or
+                not isinstance(content, (tuple, list)) or
+                getattr(response, 'cookies', None) or
+                'set-cookie' in response.headers):
+            return
+        try:
+            body = b''.join(content)
+            text = body.decode('utf-8')
+        except Exception:
+            return
+        headers = response.headers
+        entry = dict(body=text,
+                     content_type=response.content_type,
+                     headers=dict(((name, headers[name]) for name
+                                   in self.stored_headers if name in headers)),
+                     etag='"%s"' % hashlib.sha1(body).hexdigest(),
+                     last_modified=formatdate(usegmt=True))
+        response['ETag'] = entry['etag']
+        response['Last-Modified'] = entry['last_modified']
+        timeout = CacheObject()._seconds(
+            request.app, self.timeout, request.config['CACHE_DEFAULT_TIMEOUT'])
+        if timeout:
+            try:
+                request.cache_server.set_json(key, entry, timeout=timeout)
+            except Exception:
+                request.logger.exception('Could not store response in cache')
+        return entry
+
+    def cached_response(self, request, entry):
+        response = request.response
+        if not self.modified(request, entry):
+            return self.not_modified(response, entry)
+        response.status_code = 200
+        response.content_type = entry['content_type']
+        response.content = entry['body']
+        self.headers(response, entry)
+        return response
+
+    def modified(self, request, entry):
+        """Check if the resource was modified according to the
+        conditional request headers
+        """
+        etags = request.get('HTTP_IF_NONE_MATCH')
+        if etags:
+            etags = [e.strip() for e in etags.split(',')]
+            return not (entry['etag'] in etags or '*' in etags)
+        since = request.get('HTTP_IF_MODIFIED_SINCE')
+        if since:
             try:
-                int(timeout)
+                since = parsedate_to_datetime(since)
+                modified = parsedate_to_datetime(entry['last_modified'])
             except Exception:
-                timeout = config['CACHE_DEFAULT_TIMEOUT']
+                return True
+            return modified > since
+        return True
 
-            if timeout:
-                try:
-                    app.cache_server.set_json(key, result, timeout=timeout)
-                except TypeError:
-                    app.logger.exception(
-                        'Could not convert to JSON a value to set in cache')
-                except Exception:
-                    app.logger.exception('Critical error while setting cache')
+    def not_modified(self, response, entry):
+        response.status_code = 304
+        response.content = None
+        self.headers(response, entry)
+        return response
 
-        return result
+    def headers(self, response, entry):
+        response['ETag'] = entry['etag']
+        response['Last-Modified'] = entry['last_modified']
+        for name, value in entry.get('headers', {}).items():
+            response[name] = value
 
-    def __get__(self, instance, objtype):
-        obj = copy(self)
-        obj.instance = instance
-        return obj
+
+def namespace_key(app, namespace):
+    """The cache key storing the generation of a ``namespace``
+    """
+    return '%s:namespace:%s' % (app.config['APP_NAME'], namespace)
+
+
+def namespace_generation(arg, namespace):
+    """The current generation of a cache ``namespace``
+
+    When ``arg`` is a request, the generation is read from the cache server
+    once and stored in the request cache.
+    """
+    generations = _generations(arg)
+    if generations is not None and namespace in generations:
+        return generations[namespace]
+    cache = arg.app.cache_server
+    if not cache.persistent:
+        return 0
+    key = namespace_key(arg.app, namespace)
+    try:
+        value = int(cache.get(key) or 0)
+    except ValueError:
+        value = 0
+    if not value:
+        # a new (or evicted) namespace starts from the current time so that
+        # generations are never reused
+        value = _epoch()
+        cache.set(key, value)
+    if generations is not None:
+        generations[namespace] = value
+    return value
+
+
+def bump_namespace(arg, namespace):
+    """Invalidate all cache keys in ``namespace`` by incrementing
+    its generation
+
+    :param arg: the application or a request
+    :return: the new generation
+    """
+    cache = arg.app.cache_server
+    if not cache.persistent:
+        return 0
+    key = namespace_key(arg.app, namespace)
+    value = cache.incr(key)
+    if value == 1:
+        value = _epoch()
+        cache.set(key, value)
+    generations = _generations(arg)
+    if generations is not None:
+        generations[namespace] = value
+    return value
+
+
+def prefetch_cached(request, *callables):
+    """Fetch the cached values of several :func:`cached` callables in one
+    round-trip to the cache server.
+
+    Values found are stored in the ``request`` cache and used when the
+    callables are invoked during the request. For example::
+
+        prefetch_cached(request, app.cms.context_data,
+                        backend.get_permission_policies)
+
+    :return: the list of values, ``None`` for missing keys. Values of
+        callables with a ``stale`` period are returned even if expired
+    """
+    app = request.app
+    keys = [c.cache_key(request) for c in callables]
+    values = app.cache_server.get_json_many(keys)
+    prefetched = request.cache.cache_prefetch
+    if prefetched is None:
+        request.cache.cache_prefetch = prefetched = {}
+    prefetched.update(((key, value) for key, value in zip(keys, values)
+                       if value is not None))
+    return [c._unwrap(value, c._seconds(app, c.stale, 0))[0]
+            for c, value in zip(callables, values)]
 
 
 def create_cache(app, url):
@@ -288,12 +1125,49 @@ def register_cache(name, dotted_path):
 
 register_cache('dummy', 'lux.core.cache.DummyCache')
 register_cache('redis', 'lux.core.cache.RedisCache')
+register_cache('memory', 'lux.core.cache.MemoryCache')
+register_cache('tiered', 'lux.core.cache.TieredCache')
+
 
+COMPRESSION_FLAGS = {64: 'zlib', 128: 'lz4'}
+COMPRESSION_MASK = 192
+HEADERS = frozenset((
+    codec | flag
+    for codec in (Json.header, Msgpack.header, Pickle.header)
+    for flag in (0, 64, 128)
+))
 
-clear_cache = '''\
-local keys = redis.call('keys', ARGV[1]);
-for i=1,#keys,5000 do
-    redis.call('del', unpack(keys, i, math.min(i+4999, #keys)))
-end
-return #keys
-'''
+
+def _compression(name):
+    """Return a three elements tuple, the header flag, the compress and the
+    decompress functions for compression algorithm ``name``
+    """
+    if name == 'zlib':
+        return 64, zlib.compress, zlib.decompress
+    elif name == 'lz4':
+        try:
+            import lz4.frame
+        except ImportError:
+            raise ImproperlyConfigured(
+                'lz4 cache compression requires lz4: pip install lz4'
+            ) from None
+        return 128, lz4.frame.compress, lz4.frame.decompress
+    raise ImproperlyConfigured('Unknown cache compression "%s"' % name)
+
+
+def _generations(arg):
+    if hasattr(arg, 'environ'):
+        generations = arg.cache.cache_generations
+        if generations is None:
+            arg.cache.cache_generations = generations = {}
+        return generations
+
+
+def _epoch():
+    return int(1000*time.time())
+
+
+def _value_size(value):
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return sys.getsizeof(value)
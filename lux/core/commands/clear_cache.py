@@ -8,10 +8,26 @@ class Command(LuxCommand):
                 nargs='?',
                 desc=('Optional cache prefix. If omitted the default '
                       'application prefix is used (APP_NAME)')),
+        Setting('count',
+                ('--count',),
+                type=int,
+                desc=('Number of keys scanned at each step. If omitted '
+                      'CACHE_CLEAR_COUNT is used')),
+        Setting('rate',
+                ('--rate',),
+                type=int,
+                desc=('Maximum number of keys removed per second. If '
+                      'omitted CACHE_CLEAR_RATE is used')),
     )
 
     def run(self, options, **params):
         cache = self.app.cache_server
-        result = cache.clear(options.prefix)
-        self.write('Clear %d keys' % result)
+        result = cache.clear(options.prefix,
+                             count=options.count,
+                             rate=options.rate,
+                             progress=self.progress)
+        self.write('Clear %d keys' % (result or 0))
         return result
+
+    def progress(self, total):
+        self.write('Removed %d keys' % total)
@@ -58,6 +58,12 @@ class LuxModel(ABC):
             raise ImproperlyConfigured('Model "%s" not registered' % self)
         return self._app
 
+    @property
+    def cache_namespace(self):
+        """Cache namespace for values depending on this model data
+        """
+        return 'models:%s' % self.identifier
+
     # ABSTRACT METHODS
     @abstractmethod
     def session(self, request, session=None):
@@ -311,6 +317,16 @@ class Query(ABC):
     def delete(self):
         """Delete all elements in this query"""
 
+    def estimate_count(self):
+        """Estimated number of elements in this query or ``None`` if an
+        estimate is not available"""
+        return None
+
+    def count_key(self):
+        """A string identifying the set of elements selected by this query
+        or ``None``. Used to cache counts"""
+        return None
+
     def limit(self, limit):
         raise NotImplementedError
 
@@ -320,6 +336,18 @@ class Query(ABC):
     def sortby_field(self, entry, direction):
         raise NotImplementedError
 
+    def seek(self, sortby, values=None, backward=False):
+        """Order the query for keyset pagination
+
+        :param sortby: list of ``(field, direction)`` two elements tuples,
+            the last field should be unique
+        :param values: optional list of values, one for each field in
+            ``sortby``. When given, only elements after (before if
+            ``backward``) the position defined by ``values`` are selected
+        :param backward: when ``True`` the sort directions are reversed
+        """
+        raise NotImplementedError
+
     def filter_args(self, *args):
         raise NotImplementedError
 
@@ -367,18 +395,32 @@ class Query(ABC):
                 self.sortby_field(entry, direction)
         return self
 
-    def tojson(self, request, **kw):
-        """Convert to a JSON serializable list
+    def iter(self, batch=None):
+        """Iterate over elements of this query
 
-        :return: a JSON serialisable list of model objects
+        Subclasses should override to produce :class:`.ModelInstance`
+        lazily, only for the elements selected after sorting and slicing
+
+        :param batch: optional number of elements loaded from the backend
+            at once, a hint which backends are free to ignore
+        :return: an iterator over :class:`.ModelInstance`
+        """
+        return iter(self.all())
+
+    def iter_json(self, request, batch=None, **kw):
+        """Generator of JSON serializable model objects, one at a time
         """
         model = self.model
         kw['in_list'] = True
-        result = []
-        for o in self.all():
+        for o in self.iter(batch):
             try:
-                data = model.tojson(request, o, **kw)
+                yield model.tojson(request, o, **kw)
             except ModelNotAvailable:
                 continue
-            result.append(data)
-        return result
+
+    def tojson(self, request, **kw):
+        """Convert to a JSON serializable list
+
+        :return: a JSON serialisable list of model objects
+        """
+        return list(self.iter_json(request, **kw))
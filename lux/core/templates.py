@@ -1,6 +1,7 @@
+import os
 import string
 from datetime import date
-from collections import Mapping
+from collections import Mapping, OrderedDict, ChainMap
 
 import jinja2
 
@@ -27,6 +28,8 @@ def template_engine(app, name):
         if engine is None:
             raise ImproperlyConfigured('Template engine %s not available'
                                        % name)
+        # engines keep per application state (compiled templates)
+        engine = type(engine)()
         engine.configure(app)
         setattr(app, cache, engine)
     return engine
@@ -63,18 +66,64 @@ def _render_dict(app, d, render, context):
 
 class Template(str):
     """Mark a string to be a template
+
+    Templates loaded from the file system have the ``filename`` and
+    ``mtime`` attributes set.
     """
-    def __new__(cls, template=None):
+    filename = None
+    mtime = None
+
+    def __new__(cls, template=None, filename=None, mtime=None):
         if isinstance(template, Template):
             return template
         else:
-            return super().__new__(cls, template or '')
+            template = super().__new__(cls, template or '')
+            if filename:
+                template.filename = filename
+                template.mtime = mtime
+            return template
 
     def render(self, app, context, engine=None):
         rnd = app.template_engine(engine)
         return rnd(self, context)
 
 
+class TemplateCache:
+    """Resolve template names and cache their content
+
+    Templates are read from the file system only once. When the application
+    runs in debug mode, the file modification time is checked at every
+    access and templates are reloaded when changed.
+    """
+    def __init__(self, app):
+        self.app = app
+        self.templates = {}
+
+    def get(self, name):
+        if isinstance(name, list):
+            name = tuple(name)
+        template = self.templates.get(name)
+        if template is None or self.app.debug:
+            template = self.load(name, template)
+        return template
+
+    def load(self, name, template=None):
+        filename = self.app.template_full_path(name)
+        mtime = _mtime(filename)
+        if (template is None or template.filename != filename or
+                template.mtime != mtime):
+            if filename:
+                with open(filename, 'r') as file:
+                    template = Template(file.read(), filename, mtime)
+            else:
+                template = Template()
+            self.templates[name] = template
+        return template
+
+    def clear(self):
+        self.templates.clear()
+
+
 class TemplateEngine:
 
     def __call__(self, text, context):
@@ -94,9 +143,88 @@ class Python(TemplateEngine):
 
 @register_template_engine
 class Jinja2(TemplateEngine):
+    """Jinja2 engine with compiled templates cache
+
+    Templates loaded from the file system are compiled via a
+    :class:`jinja2.Environment` which caches them by filename and
+    modification time (and optionally stores their bytecode in the
+    :setting:`TEMPLATE_BYTECODE_CACHE` directory).
+    Other strings are compiled once and kept in a bounded cache.
+    """
+    env = None
 
     def __call__(self, text, *args, **kwargs):
-        return jinja2.Template(text).render(*args, **kwargs)
+        template = self.compile(text)
+        if len(args) == 1 and not kwargs and isinstance(args[0], ChainMap):
+            return self.render_chained(template, args[0])
+        return template.render(*args, **kwargs)
+
+    def render_chained(self, template, context):
+        """Render ``template`` with a chained ``context``
+
+        :meth:`jinja2.Template.render` copies its context and the template
+        globals into a new dictionary. Here the maps of ``context`` and the
+        globals are chained and shared with the jinja2 context instead, so
+        that the base layer of the context is not copied at each render.
+        """
+        parent = ChainMap(*context.maps, template.globals)
+        ctx = template.new_context(parent, shared=True)
+        try:
+            return template.environment.concat(template.root_render_func(ctx))
+        except Exception:
+            template.environment.handle_exception()
 
     def configure(self, app):
-        pass
+        cfg = app.config
+        self.cache_size = cfg['TEMPLATE_CACHE_SIZE']
+        self.templates = OrderedDict()
+        bytecode_cache = None
+        if cfg['TEMPLATE_BYTECODE_CACHE']:
+            bytecode_cache = jinja2.FileSystemBytecodeCache(
+                cfg['TEMPLATE_BYTECODE_CACHE'])
+        self.env = jinja2.Environment(loader=FileLoader(app),
+                                      cache_size=self.cache_size,
+                                      auto_reload=app.debug,
+                                      bytecode_cache=bytecode_cache)
+
+    def compile(self, text):
+        if self.env is None:
+            return jinja2.Template(text)
+        filename = getattr(text, 'filename', None)
+        if filename:
+            return self.env.get_template(filename)
+        template = self.templates.get(text)
+        if template is None:
+            template = self.env.from_string(text)
+            self.templates[text] = template
+            if len(self.templates) > self.cache_size:
+                self.templates.popitem(last=False)
+        return template
+
+
+class FileLoader(jinja2.BaseLoader):
+    """Load jinja2 templates from the file system
+
+    Template names are either absolute paths or names resolved via
+    :meth:`.Application.template_full_path`
+    """
+    def __init__(self, app):
+        self.app = app
+
+    def get_source(self, environment, template):
+        filename = template
+        if not os.path.isabs(filename):
+            filename = self.app.template_full_path(template)
+        mtime = _mtime(filename)
+        if mtime is None:
+            raise jinja2.TemplateNotFound(template)
+        with open(filename, 'r') as file:
+            source = file.read()
+        return source, filename, lambda: _mtime(filename) == mtime
+
+
+def _mtime(filename):
+    try:
+        return os.path.getmtime(filename) if filename else None
+    except OSError:
+        return None
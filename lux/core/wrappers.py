@@ -1,5 +1,5 @@
 import json
-from collections import Mapping
+from collections import Mapping, ChainMap
 
 from pulsar import Http404
 from pulsar.apps import wsgi
@@ -14,6 +14,11 @@ from ..utils.messages import error_message
 
 from .auth import Resource
 
+try:
+    import orjson
+except ImportError:     # pragma    nocover
+    orjson = None
+
 
 TEXT_CONTENT_TYPES = unique_tuple(('text/html', 'text/plain'))
 
@@ -26,8 +31,13 @@ DEFAULT_CONTENT_TYPES = unique_tuple(('text/html', 'text/plain', 'text/csv'),
 formreg = {}
 
 
-class LuxContext(dict):
-    pass
+class LuxContext(ChainMap):
+    """Template context
+
+    Writes go to a small per-request mapping chained in front of
+    the maps of :attr:`.Application.context_base` shared by all requests.
+    The jinja2 engine renders a context without copying it
+    """
 
 
 class WsgiRequest(wsgi.WsgiRequest):
@@ -94,16 +104,39 @@ class RedirectRouter(Router):
 class JsonRouter(Router):
     model = RouterParam()
     cache_control = CacheControl()
+    response_cache = RouterParam()
     response_content_types = ['application/json']
 
+    def response_wrapper(self, callable, request):
+        """Wrap route handlers with the :attr:`response_cache` if available
+
+        Subclasses overriding this method should delegate to it
+        """
+        if self.response_cache:
+            return self.response_cache(callable, request)
+        return callable(request)
+
     def head(self, request):
         if hasattr(self, 'get'):
             return self.get(request)
 
     def json_response(self, request, data):
         """Return a response as application/json
+
+        Data is encoded with orjson when available
         """
-        response = Json(data).http_response(request)
+        response = None
+        if orjson is not None:
+            try:
+                content = orjson.dumps(data)
+            except TypeError:
+                pass
+            else:
+                response = request.response
+                response.content_type = 'application/json'
+                response.content = content
+        if response is None:
+            response = Json(data).http_response(request)
         self.cache_control(response)
         return response
 
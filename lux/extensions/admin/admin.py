@@ -51,7 +51,7 @@ class AdminRouter(HtmlRouter):
             self.check_permission(request)
         except PermissionDenied:
             raise Http404 from None
-        return callable(request)
+        return super().response_wrapper(callable, request)
 
     def context(self, request):
         '''Override to add the admin navigation to the javascript context.
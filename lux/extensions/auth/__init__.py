@@ -49,13 +49,21 @@ class Extension(LuxExtension):
                   'lux.utils.crypt.pbkdf2',
                   'Python dotted path to module which provides the '
                   '``encrypt`` and, optionally, ``decrypt`` method for '
-                  'password and sensitive data encryption/decryption'),
+                  'password and sensitive data encryption/decryption. '
+                  'It can be a dictionary with the ``module`` and the '
+                  'parameters of the algorithm, such as ``iterations``. '
+                  'Passwords are encrypted again at login when these '
+                  'parameters change'),
         Parameter('PASSWORD_SECRET_KEY',
                   None,
                   'A string or bytes used for encrypting data. Must be unique '
                   'to the application and long and random enough'),
         Parameter('CHECK_USERNAME', 'lux.extensions.auth:check_username',
-                  'Dotted path to username validation function')
+                  'Dotted path to username validation function'),
+        Parameter('TOKEN_LAST_ACCESS_PRECISION', 60,
+                  'Seconds between writes of token last access times, '
+                  'which are collected in memory and updated in batches. '
+                  '0 to update at every request')
     ]
 
     def on_config(self, app):
@@ -0,0 +1,81 @@
+"""Write-behind updates of token ``last_access``
+"""
+import time
+import logging
+import threading
+
+from sqlalchemy import case
+
+
+logger = logging.getLogger('lux.extensions.auth')
+
+
+class TokenAccess:
+    """Collect the latest access time of tokens and write them to the
+    database in batches, at most once every ``precision`` seconds
+    """
+    batch = 500
+
+    def __init__(self, app, precision):
+        self.app = app
+        self.precision = precision
+        self.pending = {}
+        self.last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._scheduled = False
+
+    def __len__(self):
+        return len(self.pending)
+
+    def touch(self, token_id, when):
+        """Record an access of ``token_id`` at ``when``
+        """
+        with self._lock:
+            self.pending[token_id] = when
+            due = time.monotonic() - self.last_flush >= self.precision
+        if due:
+            self.flush()
+        else:
+            self._schedule()
+
+    def flush(self):
+        """Write pending access times to the database
+
+        :return: the number of tokens updated
+        """
+        with self._lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.monotonic()
+        if not pending:
+            return 0
+        odm = self.app.odm()
+        token = odm.token
+        items = list(pending.items())
+        try:
+            with odm.begin() as session:
+                for i in range(0, len(items), self.batch):
+                    chunk = dict(items[i:i+self.batch])
+                    query = session.query(token).filter(
+                        token.id.in_(list(chunk)))
+                    query.update({'last_access': case(chunk, value=token.id)},
+                                 synchronize_session=False)
+        except Exception:
+            logger.exception('Could not update last access of %d tokens',
+                             len(items))
+            return 0
+        return len(items)
+
+    def _schedule(self):
+        """Flush after ``precision`` seconds, so that access times are
+        written when requests stop. Only available with a green pool
+        """
+        pool = self.app.green_pool
+        if self._scheduled or not pool or not pool.in_green_worker:
+            return
+        self._scheduled = True
+        self.app._loop.call_later(self.precision, self._scheduled_flush)
+
+    def _scheduled_flush(self):
+        self._scheduled = False
+        if self.pending:
+            self.app.green_pool.submit(self.flush)
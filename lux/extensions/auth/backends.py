@@ -11,6 +11,8 @@ from lux.utils.crypt import create_uuid
 from lux.utils.auth import normalise_email
 from lux.extensions import rest
 
+from .access import TokenAccess
+
 
 def validate_username(request, username):
     module_attribute(request.config['CHECK_USERNAME'])(request, username)
@@ -35,8 +37,12 @@ class TokenBackend(PasswordMixin, rest.TokenBackend):
             with odm.begin(request=request) as session:
                 query = session.query(odm.token)
                 query = query.filter_by(id=token_id)
-                query.update({'last_access': now},
-                             synchronize_session=False)
+                access = self.token_access(request.app)
+                if access:
+                    access.touch(token_id, now)
+                else:
+                    query.update({'last_access': now},
+                                 synchronize_session=False)
                 try:
                     return query.one().user
                 except NoResultFound:
@@ -76,10 +82,21 @@ class TokenBackend(PasswordMixin, rest.TokenBackend):
         if not user:
             user = self.get_user(request, **kw)
         if user and self.crypt_verify(user.password, password):
+            if self.crypt_needs_rehash(user.password):
+                self._rehash(request, user, password)
             return user
         else:
             raise AuthenticationError('Invalid credentials')
 
+    def _rehash(self, request, user, password):
+        """Store the password of ``user`` encrypted with the current
+        :setting:`CRYPT_ALGORITHM` parameters
+        """
+        odm = request.app.odm()
+        with odm.begin() as session:
+            session.add(user)
+            user.password = self.encrypt(password)
+
     @backend_action
     def create_user(self, request, username=None, password=None, email=None,
                     first_name=None, last_name=None, active=False,
@@ -135,6 +152,22 @@ class TokenBackend(PasswordMixin, rest.TokenBackend):
             session.add(token)
         return token
 
+    def token_access(self, app):
+        """The :class:`.TokenAccess` collecting token last access times,
+        ``None`` when :setting:`TOKEN_LAST_ACCESS_PRECISION` is 0
+        """
+        access = getattr(self, '_token_access', None)
+        if access is None:
+            precision = app.config['TOKEN_LAST_ACCESS_PRECISION']
+            access = TokenAccess(app, precision) if precision else False
+            self._token_access = access
+        return access
+
+    def on_close(self, app):
+        access = getattr(self, '_token_access', None)
+        if access:
+            access.flush()
+
     def get_token(self, request, key):
         odm = request.app.odm()
         token = odm.token
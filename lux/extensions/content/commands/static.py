@@ -29,7 +29,7 @@ class StaticCache(Cache):
     def delete(self, key):
         return self.store.pop(key, None)
 
-    def clear(self, prefix=None):
+    def clear(self, prefix=None, **options):
         return self.store.clear()
 
 
@@ -9,6 +9,9 @@ from pulsar import (HttpException, PermissionDenied, BadRequest,
                     as_coroutine)
 
 from lux.core import Router
+from lux.utils.async import maybe_green
+
+from .models import invalidate_contents
 
 
 class GithubHook(Router):
@@ -87,6 +90,8 @@ class PullRepo(EventHandler):
                 response['command'] = self.command(branch)
                 result = await app.shell(request, response['command'])
                 response['result'] = result
+                await as_coroutine(
+                    maybe_green(app, invalidate_contents, request))
                 await as_coroutine(app.reload())
             else:
                 raise HttpException('Repo directory not valid', status=412)
@@ -2,14 +2,17 @@ import os
 
 from pulsar import Http404
 
-from lux.core import cached
-from lux.extensions.rest import DictModel, RestField, Query
+from lux.core import cached, bump_namespace
+from lux.core.cache import DummyCache, namespace_generation
+from lux.extensions.rest import DictModel, RestField, Query, Dataset
 from lux.utils.files import skipfile
 from lux.utils.data import as_tuple
 
 from .contents import get_reader
 
 
+CONTENT_NAMESPACE = 'contents'
+
 FIELDS = [
     RestField('priority', sortable=True, type='int'),
     RestField('order', sortable=True, type='int'),
@@ -26,6 +29,13 @@ class ContentModel(DictModel):
 
     This model provide read-only operations
     '''
+    indexes = {
+        'slug': 'hash',
+        'group': 'hash',
+        'priority': 'sorted',
+        'order': 'sorted'
+    }
+
     def __init__(self, location, name='content', fields=None, ext='md', **kw):
         if not os.path.isdir(location):
             os.makedirs(location)
@@ -40,12 +50,22 @@ class ContentModel(DictModel):
 
     def tojson(self, request, instance, in_list=False, **kw):
         instance = self.instance(instance)
-        data = instance.obj
+        # entries are shared by the cached dataset, never change them
+        data = dict(instance.obj)
         if in_list and (not instance.fields or 'body' not in instance.fields):
             data.pop('body', None)
         return self.instance_urls(request, instance, data)
 
 
+def invalidate_contents(arg):
+    """Invalidate cached contents, and datasets loaded from them, in all
+    processes
+
+    :param arg: the application or a request
+    """
+    return bump_namespace(arg, CONTENT_NAMESPACE)
+
+
 class ContentQuery(Query):
 
     def __init__(self, model, session):
@@ -57,12 +77,30 @@ class ContentQuery(Query):
             self._groups.extend(as_tuple(value))
         super().filter_field(field, op, value)
 
+    def dataset_key(self):
+        return tuple(self._groups)
+
     #  INTERNALS
+    def _get_dataset(self):
+        if self._dataset is None:
+            app = self.app
+            if isinstance(app.cache_server, DummyCache):
+                # nothing is cached, contents are read for each query
+                self._dataset = Dataset(self.model, self._get_data())
+            else:
+                # datasets are reloaded when contents are invalidated
+                self._dataset = self.model.dataset(
+                    self.dataset_key(), self._get_data,
+                    app.config['CACHE_DEFAULT_TIMEOUT'],
+                    namespace_generation(self.request, CONTENT_NAMESPACE))
+        return self._dataset
+
     def _get_data(self):
         if self._data is None:
             self._data = []
             for group in self._groups:
-                cache = cached(app=self.app, key='contents:%s' % group)
+                cache = cached(app=self.app, key='contents:%s' % group,
+                               namespace=CONTENT_NAMESPACE)
                 self._data.extend(cache(self._all)(group))
         return self._data
 
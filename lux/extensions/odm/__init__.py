@@ -9,19 +9,23 @@ built on top of sqlalchemy, pulsar and greenlet.
 
 _ ..pulsar-odm: https://github.com/quantmind/pulsar-odm
 """
+from collections import OrderedDict, deque
+
 from odm import declared_attr
 
-from lux.core import Parameter, LuxExtension
+from lux.core import Parameter, LuxExtension, bump_namespace
 
 from .mapper import Mapper, model_base
 from .models import RestModel, RestField, odm_models
+from .instrument import SqlStats, SqlStatsRouter, sql_response
 
 
 __all__ = ['model_base',
            'odm_models',
            'declared_attr',
            'RestModel',
-           'RestField']
+           'RestField',
+           'SqlStats']
 
 
 sql_delete = 'delete'
@@ -44,6 +48,23 @@ class Extension(LuxExtension):
                   'operator'),
         Parameter('CHANNEL_DATAMODEL', 'datamodel',
                   'Channel name for data models updates'),
+        Parameter('DATABASE_CACHE_NAMESPACES', False,
+                  'Invalidate the cache namespace of models changed in a '
+                  'database session flush. Each changed model costs a round '
+                  'trip to the cache server'),
+        Parameter('SQL_STATS', 0,
+                  'Fraction of requests, between 0 and 1, for which SQL '
+                  'statements are instrumented'),
+        Parameter('SQL_STATS_URL', None,
+                  'Url serving statistics of recent instrumented requests'),
+        Parameter('SQL_STATS_HISTORY', 100,
+                  'Number of instrumented requests kept in memory'),
+        Parameter('SQL_LOG_THRESHOLD', 500,
+                  'Log instrumented requests spending more milliseconds '
+                  'than this in the database'),
+        Parameter('SQL_DUPLICATE_THRESHOLD', 5,
+                  'Number of executions of the same statement in a request '
+                  'reported as duplicates (N+1 queries)'),
     ]
 
     def on_config(self, app):
@@ -51,6 +72,15 @@ class Extension(LuxExtension):
         self.require(app, 'lux.extensions.rest')
         app.odm = Odm(app)
 
+    def middleware(self, app):
+        url = app.config['SQL_STATS_URL']
+        if url:
+            yield SqlStatsRouter(url)
+
+    def response_middleware(self, app):
+        if app.config['SQL_STATS']:
+            return [sql_response]
+
     def on_after_flush(self, app, session):
         """broadcast models events into the data-models channel
 
@@ -59,18 +89,44 @@ class Extension(LuxExtension):
         data: JSON representation of model
 
         <event> is one of ``create``, ``update``, ``delete``
+
+        For bulk sessions changes are coalesced into one message for each
+        model, with event ``bulk`` and data a dictionary of lists of models
+        keyed by event.
+
+        When :setting:`DATABASE_CACHE_NAMESPACES` is ``True``, the
+        :attr:`~.LuxModel.cache_namespace` of changed models is bumped
         """
         request = session.request
-        if not app.channels or not request:
-            return
+        if request:
+            # related representations may have changed
+            request.cache.id_reprs = None
+        publish = app.channels and request
         models = odm_models(app)
+        channel = app.config['CHANNEL_DATAMODEL']
+        bulk = OrderedDict() if getattr(session, 'bulk', False) else None
+        namespaces = app.config['DATABASE_CACHE_NAMESPACES']
+        changed = set()
         for instance, event in session.changes():
             model = models.get(instance.__class__.__name__.lower())
             if model:
+                if namespaces:
+                    changed.add(model.cache_namespace)
+                if not publish:
+                    continue
                 data = model.tojson(request, instance, in_list=True, safe=True)
-                app.channels.publish(app.config['CHANNEL_DATAMODEL'],
-                                     '%s.%s' % (model.identifier, event),
-                                     data)
+                if bulk is None:
+                    app.channels.publish(channel,
+                                         '%s.%s' % (model.identifier, event),
+                                         data)
+                else:
+                    events = bulk.setdefault(model.identifier, {})
+                    events.setdefault(event, []).append(data)
+        if bulk:
+            for identifier, events in bulk.items():
+                app.channels.publish(channel, '%s.bulk' % identifier, events)
+        for namespace in changed:
+            bump_namespace(request or app, namespace)
 
     def on_close(self, app):
         app.odm().close()
@@ -83,6 +139,7 @@ class Odm:
 
     def __init__(self, app):
         self.app = app
+        self.sql_stats = deque(maxlen=app.config['SQL_STATS_HISTORY'])
 
     @property
     def binds(self):
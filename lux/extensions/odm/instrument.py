@@ -0,0 +1,133 @@
+"""SQL instrumentation of database sessions bound to a request.
+
+Statements executed by a sampled request are recorded in a
+:class:`.SqlStats` stored in ``request.cache.sql_stats``. Statistics are
+added to the ``Server-Timing`` response header, logged when above
+:setting:`SQL_LOG_THRESHOLD` and kept in ``app.odm.sql_stats`` for the
+:setting:`SQL_STATS_URL` endpoint.
+"""
+import time
+import random
+import logging
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.event import listens_for
+
+from pulsar import PermissionDenied
+from pulsar.apps.wsgi import wsgi_request
+
+from lux.core import JsonRouter
+
+
+logger = logging.getLogger('lux.sql')
+
+STATS_KEY = 'lux.sql_stats'
+START_KEY = 'lux.sql_start'
+
+
+class SqlStats:
+    """Statistics of SQL statements executed during a request
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.count = 0
+        self.time = 0
+        self.slowest = None
+        self.slowest_time = 0
+        self.statements = {}
+
+    def add(self, statement, duration):
+        self.count += 1
+        self.time += duration
+        statements = self.statements
+        statements[statement] = statements.get(statement, 0) + 1
+        if duration > self.slowest_time:
+            self.slowest = statement
+            self.slowest_time = duration
+
+    def duplicates(self, threshold=2):
+        """Statements executed at least ``threshold`` times, a sign of
+        N+1 queries
+        """
+        return dict(((statement, count) for statement, count
+                     in self.statements.items() if count >= threshold))
+
+    def server_timing(self):
+        return 'db;dur=%.3f;desc="%d queries"' % (1000 * self.time,
+                                                  self.count)
+
+    def tojson(self, threshold=2):
+        return {'path': self.path,
+                'count': self.count,
+                'time': round(1000 * self.time, 3),
+                'slowest': self.slowest,
+                'slowest_time': round(1000 * self.slowest_time, 3),
+                'duplicates': self.duplicates(threshold)}
+
+
+def sql_stats(request):
+    """The :class:`.SqlStats` for ``request`` or ``None`` when the request
+    is not sampled
+    """
+    if request is None:
+        return
+    stats = request.cache.sql_stats
+    if stats is None:
+        sample = request.config['SQL_STATS']
+        if sample and random.random() < sample:
+            stats = SqlStats(request.path)
+        else:
+            stats = False
+        request.cache.sql_stats = stats
+    return stats or None
+
+
+def sql_response(environ, response):
+    """Response middleware adding SQL statistics to the response headers
+    """
+    request = wsgi_request(environ)
+    stats = request.cache.sql_stats
+    if stats:
+        cfg = request.config
+        response['Server-Timing'] = stats.server_timing()
+        data = stats.tojson(cfg['SQL_DUPLICATE_THRESHOLD'])
+        request.app.odm.sql_stats.append(data)
+        if 1000 * stats.time >= cfg['SQL_LOG_THRESHOLD']:
+            logger.warning('%d SQL statements in %.1f ms for %s',
+                           stats.count, data['time'], stats.path,
+                           extra={'sql': data})
+        elif data['duplicates']:
+            logger.warning('Duplicate SQL statements for %s', stats.path,
+                           extra={'sql': data})
+    return response
+
+
+class SqlStatsRouter(JsonRouter):
+    """Serve statistics of the most recent sampled requests
+
+    Available to superusers only, unless the application is in debug mode
+    """
+    def get(self, request):
+        if not request.app.debug:
+            user = request.cache.user
+            if not user or not user.is_superuser():
+                raise PermissionDenied
+        data = {'result': list(reversed(request.app.odm.sql_stats))}
+        return self.json_response(request, data)
+
+
+@listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    if conn.info.get(STATS_KEY):
+        conn.info.setdefault(START_KEY, []).append(time.perf_counter())
+
+
+@listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context,
+                         executemany):
+    stats = conn.info.get(STATS_KEY)
+    if stats:
+        starts = conn.info.get(START_KEY)
+        if starts:
+            stats.add(statement, time.perf_counter() - starts.pop())
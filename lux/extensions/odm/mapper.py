@@ -6,6 +6,8 @@ import odm
 
 from pulsar import ImproperlyConfigured
 
+from .instrument import sql_stats, STATS_KEY, START_KEY
+
 __all__ = ['Mapper', 'model_base']
 
 
@@ -40,6 +42,8 @@ class Mapper(odm.Mapper):
 
 
 class LuxSession(odm.OdmSession):
+    # when True changes are broadcast as one message per model and flush
+    bulk = False
 
     def __init__(self, mapper, request=None, **options):
         super().__init__(mapper, **options)
@@ -67,6 +71,15 @@ def after_flush(session, flush_context=None, instances=None):
     session.app.fire('on_after_flush', session, safe=True)
 
 
+@listens_for(LuxSession, 'after_begin')
+def after_begin(session, transaction, connection):
+    # connections are pooled, always replace statistics of previous sessions
+    info = connection.info
+    info[STATS_KEY] = sql_stats(session.request)
+    info.pop(START_KEY, None)
+    session.info.setdefault(STATS_KEY, []).append(info)
+
+
 @listens_for(LuxSession, 'before_commit')
 def before_commit(session, flush_context=None, instances=None):
     session.app.fire('on_before_commit', session, safe=True)
@@ -80,3 +93,19 @@ def after_commit(session, flush_context=None, instances=None):
 @listens_for(LuxSession, 'after_rollback')
 def after_rollback(session, flush_context=None, instances=None):
     session.app.fire('on_after_rollback', session, safe=True)
+
+
+@listens_for(LuxSession, 'after_transaction_end')
+def after_transaction_end(session, transaction):
+    # committed, rolled back or closed
+    if transaction.parent is None:
+        clear_sql_stats(session)
+
+
+def clear_sql_stats(session):
+    """Detach the statistics of the request from connections used by
+    ``session``, so that other uses of pooled connections are not recorded
+    """
+    for info in session.info.pop(STATS_KEY, ()):
+        info.pop(STATS_KEY, None)
+        info.pop(START_KEY, None)
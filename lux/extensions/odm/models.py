@@ -1,19 +1,31 @@
 import json
+import uuid
 from datetime import date, datetime
 from enum import Enum
 from functools import partial
+from collections import OrderedDict
 
 import pytz
+from dateutil.parser import parse as dateparser
 
-from sqlalchemy import Column, desc, String
-from sqlalchemy.orm import class_mapper, load_only
+from sqlalchemy import (Column, desc, String, and_, or_, tuple_, false,
+                        nullsfirst, nullslast)
+from sqlalchemy.orm import class_mapper, load_only, joinedload
 from sqlalchemy.orm.base import instance_state
-from sqlalchemy.sql.expression import func, cast
+from sqlalchemy.sql.expression import (func, cast, text, Executable,
+                                       ClauseElement)
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.exc import DataError, StatementError
 from sqlalchemy.orm.exc import (NoResultFound, MultipleResultsFound,
                                 ObjectDeletedError)
 
-from pulsar import Http404
+from pulsar import Http404, BadRequest
+
+try:
+    from sqlalchemy.orm import selectinload
+except ImportError:     # pragma    nocover
+    # subqueryload cannot be combined with yield_per
+    selectinload = joinedload
 
 from odm.utils import get_columns
 
@@ -27,6 +39,18 @@ RestField = rest.RestField
 is_rel_field = rest.is_rel_field
 
 
+class Explain(Executable, ClauseElement):
+    """The JSON query plan of a ``statement``"""
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, 'postgresql')
+def _compile_explain(element, compiler, **kw):
+    return 'EXPLAIN (FORMAT JSON) %s' % compiler.process(element.statement,
+                                                         **kw)
+
+
 class Query(BaseQuery):
     """ODM based query"""
 
@@ -44,8 +68,52 @@ class Query(BaseQuery):
     def count(self):
         return self._query().count()
 
+    def estimate_count(self):
+        """Estimate from the PostgreSQL statistics: the number of rows of the
+        table for unfiltered queries, the planner estimate otherwise
+
+        Errors are logged and ``None`` is returned so that the exact count
+        is used instead
+        """
+        odm = self.app.odm()
+        engine = odm.binds[odm[self.name].__table__]
+        if engine.dialect.name != 'postgresql':
+            return
+        session = self.sql_query.session
+        try:
+            # a savepoint keeps the transaction usable if the estimate fails
+            with session.begin_nested():
+                total = self._estimate(session.connection())
+        except Exception:
+            self.logger.exception('Could not estimate the number of %s',
+                                  self.name)
+            return
+        # statistics not available (table never analysed)
+        if total is not None and total > 0:
+            return int(total)
+
+    def _estimate(self, connection):
+        query = self.sql_query
+        if query.whereclause is None and not self.joins:
+            table = self.app.odm()[self.name].__table__
+            return connection.execute(
+                text('SELECT reltuples FROM pg_class '
+                     'WHERE oid = CAST(:table AS regclass)'),
+                {'table': table.fullname}
+            ).scalar()
+        # parameters go through bind processing as in the query itself
+        plan = connection.execute(Explain(query.statement)).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']['Plan Rows']
+
+    def count_key(self):
+        compiled = self.sql_query.statement.compile()
+        params = sorted(compiled.params.items())
+        return '%s\n%s' % (compiled, params)
+
     def one(self):
-        query = self._query()
+        query = self._load_query()
         try:
             one = query.one()
         except MissingObjectError:
@@ -60,7 +128,36 @@ class Query(BaseQuery):
     def all(self):
         model = self.model
         fields = self.fields
-        return [model.instance(o, fields) for o in self._query().all()]
+        return [model.instance(o, fields) for o in self._load_query().all()]
+
+    def iter_json(self, request, batch=None, **kw):
+        if type(self.model).tojson is not RestModel.tojson:
+            yield from super().iter_json(request, batch, **kw)
+            return
+        kw['in_list'] = True
+        serializer = self.model.json_serializer(fields=self.fields, **kw)
+        for instance in self.iter(batch):
+            try:
+                yield serializer(request, instance)
+            except ModelNotAvailable:
+                continue
+
+    def iter(self, batch=None):
+        """Iterate over instances as rows are fetched
+
+        :param batch: optional number of rows loaded from the database at
+            once. When not given all rows are loaded at once. Collections
+            are not eager loaded in batches since ``yield_per`` does not
+            support their loaders
+        """
+        model = self.model
+        fields = self.fields
+        if batch:
+            query = self._load_query(False).yield_per(batch)
+        else:
+            query = self._load_query()
+        for o in query:
+            yield model.instance(o, fields)
 
     def delete(self):
         return self._query().delete()
@@ -183,16 +280,117 @@ class Query(BaseQuery):
             self.sql_query = self.sql_query.order_by(entry)
         return self
 
+    def seek(self, sortby, values=None, backward=False):
+        db_model = self.model.db_model()
+        columns = []
+        for name, direction in sortby:
+            column = getattr(db_model, name)
+            columns.append((column, (direction == 'desc') != backward))
+        query = self.sql_query
+        if values is not None:
+            values = [_column_value(column, value)
+                      for (column, _), value in zip(columns, values)]
+            query = query.filter(_seek_clause(columns, values, backward))
+        order = [_seek_order(column, reverse, backward)
+                 for column, reverse in columns]
+        self.sql_query = query.order_by(*order)
+        return self
+
     def _query(self):
         if self.fields:
             fields = self.model.db_columns(self.fields)
             self.sql_query = self.sql_query.options(load_only(*fields))
         return self.sql_query
 
+    def _load_query(self, collections=True):
+        """The query with eager loading of related fields
+        """
+        query = self._query()
+        options = self.model.eager_load(self.fields, collections)
+        return query.options(*options) if options else query
+
+
+def _seek_clause(columns, values, backward=False):
+    """Select rows after the position given by ``values``.
+
+    ``NULL`` values are placed last, first when ``backward``, as in
+    :func:`_seek_order`. When all columns are sorted in the same direction
+    and neither columns nor ``values`` can be null, use a row value
+    comparison ``(a, b) > (x, y)`` which can be satisfied by a composite
+    index, otherwise expand it into ``a > x OR (a = x AND b > y)``
+    """
+    directions = set((reverse for _, reverse in columns))
+    if (len(directions) == 1 and None not in values and
+            not any((_nullable(column) for column, _ in columns))):
+        left = tuple_(*[column for column, _ in columns])
+        right = tuple_(*values)
+        return left < right if directions.pop() else left > right
+    clauses = []
+    for i, (column, reverse) in enumerate(columns):
+        value = values[i]
+        if value is None:
+            # only non null values follow nulls, when backward
+            if not backward:
+                continue
+            clause = column.isnot(None)
+        else:
+            clause = column < value if reverse else column > value
+            if not backward and _nullable(column):
+                clause = or_(clause, column.is_(None))
+        equals = [c.is_(None) if v is None else c == v
+                  for (c, _), v in zip(columns[:i], values)]
+        clauses.append(and_(*equals, clause) if equals else clause)
+    return or_(*clauses) if clauses else false()
+
+
+def _seek_order(column, reverse, backward):
+    order = desc(column) if reverse else column
+    if _nullable(column):
+        order = nullsfirst(order) if backward else nullslast(order)
+    return order
+
+
+def _nullable(column):
+    try:
+        return column.property.columns[0].nullable
+    except Exception:
+        return True
+
+
+def _column_value(column, value):
+    """Convert a cursor ``value``, decoded from JSON, to the python type
+    of ``column``
+    """
+    if not isinstance(value, str):
+        return value
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    try:
+        if issubclass(python_type, datetime):
+            return dateparser(value)
+        elif issubclass(python_type, date):
+            return dateparser(value).date()
+        elif issubclass(python_type, Enum):
+            return python_type[value]
+    except (ValueError, OverflowError, KeyError):
+        raise BadRequest('Invalid pagination cursor')
+    return value
+
 
 class RestModel(rest.RestModel):
     '''A rest model based on SqlAlchemy ORM
+
+    .. attribute:: plans_size
+
+        Maximum number of compiled serializers and eager load options
+        kept, their keys depend on the fields requested by clients
     '''
+    plans_size = 128
+    _serializers = None
+    _eager_loads = None
+
     def register(self, app):
         super().register(app)
         odm_models(app)[self.name] = self
@@ -211,61 +409,36 @@ class RestModel(rest.RestModel):
     def tojson(self, request, instance, in_list=False, exclude=None,
                exclude_related=None, safe=False, **kw):
         instance = self.instance(instance)
-        obj = instance.obj
-        if instance_state(obj).detached:
-            with self.session(request) as session:
-                session.add(obj)
-                return self.tojson(request, instance, in_list=in_list,
-                                   exclude_related=exclude_related, safe=safe,
-                                   exclude=exclude, **kw)
-        info = self._fields
-        exclude = info.exclude(exclude, exclude_urls=True)
-        load_only = instance.fields
-
-        fields = {}
-        for field in self.fields().values():
-            name = field.name
-            if name in exclude or (load_only and name not in load_only):
-                continue
-            try:
-                data = self.get_instance_value(instance, name)
-                if isinstance(data, date):
-                    if isinstance(data, datetime) and not data.tzinfo:
-                        data = pytz.utc.localize(data)
-                    data = data.isoformat()
-                elif isinstance(data, Enum):
-                    data = data.name
-                elif is_rel_field(field):
-                    if exclude_related:
-                        continue
-                    model = request.app.models.get(field.model)
-                    if model:
-                        data = self._related_model(request, model, data,
-                                                   in_list)
-                    else:
-                        data = None
-                        request.logger.error(
-                            'Could not find model %s', field.model)
-                else:  # Test Json
-                    json.dumps(data)
-            except TypeError:
-                try:
-                    data = str(data)
-                except Exception:
-                    continue
-            except ObjectDeletedError:
-                raise ModelNotAvailable from None
-            except Exception:
-                if not safe:
-                    request.logger.exception(
-                        'Exception while converting attribute "%s" in model '
-                        '%s to JSON', name, self)
-                continue
-            if data is not None:
-                if isinstance(data, list):
-                    name = '%s[]' % name
-                fields[name] = data
-        return self.instance_urls(request, instance, fields)
+        serializer = self.json_serializer(in_list=in_list, exclude=exclude,
+                                          exclude_related=exclude_related,
+                                          safe=safe, fields=instance.fields)
+        return serializer(request, instance)
+
+    def json_serializer(self, in_list=False, exclude=None,
+                        exclude_related=None, safe=False, fields=None, **kw):
+        """Return a function converting instances to JSON serializable
+        dictionaries.
+
+        The conversion plan is compiled, from column types, excluded and
+        related fields, once for each combination of parameters
+        """
+        key = (in_list, frozenset(exclude) if exclude else None,
+               bool(exclude_related), safe,
+               frozenset(fields) if fields else None)
+        if self._serializers is None:
+            self._serializers = OrderedDict()
+        serializer = _lru_get(self._serializers, key)
+        if serializer is None:
+            plan = self._json_plan(exclude, exclude_related, fields)
+            serializer = partial(self._serialize, plan, in_list, safe)
+            _lru_set(self._serializers, key, serializer, self.plans_size)
+        return serializer
+
+    def __copy__(self):
+        model = super().__copy__()
+        model._serializers = None
+        model._eager_loads = None
+        return model
 
     def get_instance_value(self, instance, name):
         try:
@@ -318,18 +491,66 @@ class RestModel(rest.RestModel):
 
     # ADDITIONAL PUBLIC METHODS
     def id_repr(self, request, obj, in_list=True):
+        """Representation of a related ``obj``
+
+        Results are cached for the duration of the ``request``
+        """
         if obj:
-            if in_list:
-                data = {'id': as_hex(getattr(obj, self.id_field))}
-            else:
-                data = self.tojson(request, obj, exclude_related=True)
-                data['id'] = data.pop(self.id_field)
+            key = as_hex(getattr(obj, self.id_field))
+            if key is None:
+                return self._id_repr(request, obj, in_list)
+            reprs = request.cache.id_reprs
+            if reprs is None:
+                reprs = request.cache.id_reprs = {}
+            key = (self.identifier, in_list, key)
+            data = reprs.get(key)
+            if data is None:
+                data = self._id_repr(request, obj, in_list)
+                reprs[key] = data
+            return dict(data)
+
+    def eager_load(self, load_only=None, collections=True):
+        """Loader options for related fields in ``load_only`` (all related
+        fields if not given): ``selectinload`` for collections and
+        ``joinedload`` for scalar relationships.
+
+        When ``collections`` is ``False`` only scalar relationships are
+        eager loaded
+        """
+        key = (frozenset(load_only) if load_only else None, collections)
+        if self._eager_loads is None:
+            self._eager_loads = OrderedDict()
+        options = _lru_get(self._eager_loads, key)
+        if options is None:
+            db_model = self.db_model()
+            relationships = class_mapper(db_model).relationships
+            options = []
+            for field in self.fields().values():
+                name = field.name
+                if (not is_rel_field(field) or name not in relationships or
+                        (load_only and name not in load_only)):
+                    continue
+                attribute = getattr(db_model, name)
+                if relationships[name].uselist:
+                    if collections:
+                        options.append(selectinload(attribute))
+                else:
+                    options.append(joinedload(attribute))
+            _lru_set(self._eager_loads, key, options, self.plans_size)
+        return options
 
-            if self.repr_field != self.id_field:
-                repr = getattr(obj, self.repr_field)
-                if repr != data['id']:
-                    data['repr'] = repr
-            return data
+    def _id_repr(self, request, obj, in_list):
+        if in_list:
+            data = {'id': as_hex(getattr(obj, self.id_field))}
+        else:
+            data = self.tojson(request, obj, exclude_related=True)
+            data['id'] = data.pop(self.id_field)
+
+        if self.repr_field != self.id_field:
+            repr = getattr(obj, self.repr_field)
+            if repr != data['id']:
+                data['repr'] = repr
+        return data
 
     def db_model(self):
         '''Database model
@@ -390,6 +611,70 @@ class RestModel(rest.RestModel):
 
         return rest
 
+    def _json_plan(self, exclude, exclude_related, load_only):
+        """A list of ``(name, direct, converter, related model)`` tuples
+        """
+        exclude = self._fields.exclude(exclude, exclude_urls=True)
+        columns = self._fields.load(self).db_columns
+        # a custom get_instance_value must be used for all fields
+        direct = (type(self).get_instance_value is
+                  RestModel.get_instance_value)
+        plan = []
+        for field in self.fields().values():
+            name = field.name
+            if name in exclude or (load_only and name not in load_only):
+                continue
+            if is_rel_field(field):
+                if exclude_related:
+                    continue
+                model = self.app.models.get(field.model)
+                if not model:
+                    self.app.logger.error('Could not find model %s',
+                                          field.model)
+                    continue
+                plan.append((name, False, None, model))
+            elif direct and isinstance(columns.get(name), Column):
+                plan.append((name, True, _column_converter(columns[name]),
+                             None))
+            else:
+                plan.append((name, False, _json_value, None))
+        return plan
+
+    def _serialize(self, plan, in_list, safe, request, instance):
+        instance = self.instance(instance)
+        obj = instance.obj
+        if instance_state(obj).detached:
+            with self.session(request) as session:
+                session.add(obj)
+                return self._serialize(plan, in_list, safe, request,
+                                       instance)
+        fields = {}
+        for name, direct, converter, model in plan:
+            try:
+                if direct:
+                    data = getattr(obj, name)
+                else:
+                    data = self.get_instance_value(instance, name)
+                if data is None:
+                    continue
+                elif model:
+                    data = self._related_model(request, model, data, in_list)
+                elif converter:
+                    data = converter(data)
+            except ObjectDeletedError:
+                raise ModelNotAvailable from None
+            except Exception:
+                if not safe:
+                    request.logger.exception(
+                        'Exception while converting attribute "%s" in model '
+                        '%s to JSON', name, self)
+                continue
+            if data is not None:
+                if isinstance(data, list):
+                    name = '%s[]' % name
+                fields[name] = data
+        return self.instance_urls(request, instance, fields)
+
     def _related_model(self, request, model, obj, in_list):
         if isinstance(obj, list):
             return [self._related_model(request, model, d, True) for d in obj]
@@ -397,6 +682,74 @@ class RestModel(rest.RestModel):
             return model.id_repr(request, obj, in_list)
 
 
+def _lru_get(cache, key):
+    value = cache.get(key)
+    if value is not None:
+        try:
+            cache.move_to_end(key)
+        except KeyError:    # evicted by another thread
+            pass
+    return value
+
+
+def _lru_set(cache, key, value, size):
+    cache[key] = value
+    if len(cache) > size:
+        cache.popitem(last=False)
+
+
+def _column_converter(col):
+    """Converter to JSON for values of column ``col``, ``None`` when values
+    don't need conversion
+    """
+    try:
+        python_type = col.type.python_type
+    except NotImplementedError:
+        return _json_value
+    if python_type in _json_types:
+        return None
+    elif issubclass(python_type, datetime):
+        return _datetime_json
+    elif issubclass(python_type, date):
+        return _date_json
+    elif issubclass(python_type, Enum):
+        return _enum_json
+    elif issubclass(python_type, uuid.UUID):
+        return as_hex
+    else:
+        return _json_value
+
+
+def _datetime_json(value):
+    if isinstance(value, datetime) and not value.tzinfo:
+        value = pytz.utc.localize(value)
+    return value.isoformat()
+
+
+def _date_json(value):
+    return value.isoformat()
+
+
+def _enum_json(value):
+    return value.name
+
+
+def _json_value(value):
+    """Convert a value of unknown type"""
+    value = as_hex(value)
+    if isinstance(value, datetime):
+        return _datetime_json(value)
+    elif isinstance(value, date):
+        return _date_json(value)
+    elif isinstance(value, Enum):
+        return _enum_json(value)
+    try:
+        json.dumps(value)
+    except TypeError:
+        value = str(value)
+    return value
+
+
 def column_info(name, col):
     sortable = True
     filter = True
@@ -423,6 +776,8 @@ def odm_models(app):
     return {}
 
 
+_json_types = frozenset((int, float, str, bool))
+
 _types = {int: 'integer',
           bool: 'boolean',
           date: 'date',
@@ -131,7 +131,7 @@ class UserView(HtmlRouter):
                 request.cache.page_entity = q.one()
         except Exception:
             raise self.SkipRoute
-        return callable(request)
+        return super().response_wrapper(callable, request)
 
     def get_html(self, request):
         app = request.app
@@ -12,9 +12,9 @@ from .api import Apis
 from .api.client import ApiClient, HttpRequestMixin
 from .views.rest import RestRouter, MetadataMixin, CRUD, Rest404
 from .views.spec import Specification
-from .pagination import Pagination, GithubPagination
+from .pagination import Pagination, GithubPagination, CursorPagination
 from .forms import RelationshipField, UniqueField
-from .query import Query, RestSession
+from .query import Query, RestSession, Dataset
 from .token import TokenBackend, ServiceUser, CORS
 from .permissions import user_permissions, validate_policy
 
@@ -34,10 +34,12 @@ __all__ = [
     "HttpRequestMixin",
     #
     'Query',
+    'Dataset',
     'RestSession',
     #
     'Pagination',
     'GithubPagination',
+    'CursorPagination',
     #
     # Form fields related to rest models
     'RelationshipField',
@@ -92,6 +94,8 @@ class Extension(LuxExtension):
                   'The query key for full text search'),
         Parameter('API_OFFSET_KEY', 'offset', ''),
         Parameter('API_LIMIT_KEY', 'limit', ''),
+        Parameter('API_CURSOR_KEY', 'cursor',
+                  'The query key for the cursor of keyset pagination'),
         Parameter('API_LIMIT_DEFAULT', 25,
                   'Default number of items returned when no limit '
                   'API_LIMIT_KEY available in the url'),
@@ -103,6 +107,19 @@ class Extension(LuxExtension):
                    'not authenticated')),
         Parameter('PAGINATION', 'lux.extensions.rest.Pagination',
                   'Pagination class'),
+        Parameter('API_COUNT', 'exact',
+                  ('Policy for the total number of items in list and '
+                   'metadata responses: exact, estimated or none')),
+        Parameter('API_COUNT_KEY', 'count',
+                  'The query key for overriding the API_COUNT policy'),
+        Parameter('API_COUNT_CACHE_TIMEOUT', 0,
+                  'Seconds exact counts are cached for. 0 for no caching'),
+        Parameter('API_EXPORT_BATCH', 1000,
+                  ('Number of rows fetched from the database, and written '
+                   'to the response, at a time when streaming NDJSON or CSV '
+                   'exports')),
+        Parameter('API_BULK_LIMIT', 10000,
+                  'Maximum number of items in a bulk request'),
         Parameter('MAX_TOKEN_SESSION_EXPIRY', 7 * 24 * 60 * 60,
                   'Maximum expiry for a token used by a web site in seconds.'),
         #
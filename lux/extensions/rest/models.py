@@ -1,16 +1,22 @@
+import time
+import hashlib
 from copy import copy
 from itertools import chain
 from collections import Mapping, OrderedDict
 from urllib.parse import urljoin, urlparse, urlunparse
 
+from pulsar import BadRequest
 from pulsar.utils.html import nicename
 from pulsar.utils.httpurl import is_absolute_uri
+from pulsar.utils.importer import module_attribute
 
-from lux.core import LuxModel, GET_HEAD
+from lux.core import LuxModel, ModelNotAvailable, GET_HEAD
 
-from .query import Query, RestSession
+from .query import Query, RestSession, Dataset
 
 
+COUNT_POLICIES = frozenset(('exact', 'estimated', 'none'))
+
 CONVERTERS = {
     'int': lambda value: int(value),
     'float': lambda value: float(value)
@@ -233,12 +239,15 @@ class RestModel(LuxModel, RestClient):
     api_route = None
     spec = None
     json_docs = None
+    pagination = None
+    count_policy = None
 
     def __init__(self, name, form=None, updateform=None,
                  putform=None, postform=None, fields=None,
                  url=None, exclude=None, html_url=None, id_field=None,
                  repr_field=None, hidden=None, list_exclude=None,
-                 spec=None, json_docs=None):
+                 spec=None, json_docs=None, pagination=None,
+                 count_policy=None):
         assert name, 'model name not available'
         self.name = name
         self.form = form
@@ -247,6 +256,8 @@ class RestModel(LuxModel, RestClient):
         self.putform = putform
         self.spec = spec or self.spec
         self.json_docs = json_docs or self.json_docs or {}
+        self.pagination = pagination or self.pagination
+        self.count_policy = count_policy or self.count_policy
         self._url = url if url is not None else '%ss' % name
         self._html_url = html_url
         self.api_name = '%s_url' % self._url.replace('/', '_')
@@ -333,23 +344,89 @@ class RestModel(LuxModel, RestClient):
                     data[url_name] = url
         return data
 
+    def get_pagination(self, request):
+        """The pagination for this model
+
+        The :attr:`pagination` attribute (a dotted path or a
+        pagination instance) if available, otherwise the application
+        pagination from the :setting:`PAGINATION` setting
+        """
+        pagination = self.pagination
+        if pagination is None:
+            return request.app.pagination
+        elif isinstance(pagination, str):
+            self.pagination = pagination = module_attribute(pagination)()
+        return pagination
+
+    def query_count(self, request, query, count=None):
+        """Total number of elements in ``query`` according to a
+        count policy
+
+        :param count: optional count policy, if not given the
+            :attr:`count_policy` or the :setting:`API_COUNT` setting is used.
+            ``exact`` for an exact count (cached for
+            :setting:`API_COUNT_CACHE_TIMEOUT` seconds), ``estimated`` for
+            an estimate from the query planner when available or ``none``
+        :return: the count or ``None`` when not computed
+        """
+        policy = count or self.count_policy or request.config['API_COUNT']
+        if policy not in COUNT_POLICIES:
+            raise BadRequest('Invalid count policy "%s"' % policy)
+        if policy == 'none':
+            return None
+        if policy == 'estimated':
+            total = query.estimate_count()
+            if total is not None:
+                return total
+        timeout = request.config['API_COUNT_CACHE_TIMEOUT']
+        key = query.count_key() if timeout else None
+        if not key:
+            return query.count()
+        key = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        key = '%s:count:%s:%s' % (request.config['APP_NAME'],
+                                  self.identifier, key)
+        cache = request.cache_server
+        total = cache.get_json(key)
+        if total is None:
+            total = query.count()
+            cache.set_json(key, total, timeout=timeout)
+        return total
+
     def query_data(self, request, *filters, limit=None, offset=None,
-                   sortby=None, max_limit=None, session=None, **params):
+                   sortby=None, max_limit=None, session=None, cursor=None,
+                   count=None, **params):
         """Application query method
 
         This method does not use url data
         """
+        pagination = self.get_pagination(request)
         with self.session(request, session=session) as session:
             query = self.query(request, session, *filters, **params)
             limit = self.limit(request, limit, max_limit)
+            if pagination.cursor:
+                return self._cursor_data(request, pagination, query, limit,
+                                         sortby, cursor, count, **params)
             offset = get_offset(offset)
-            total = query.count()
+            total = self.query_count(request, query, count)
             query = query.sortby(sortby).limit(limit).offset(offset)
             data = query.tojson(request, **params)
-            return request.app.pagination(request, data, total, limit, offset)
+            return pagination(request, data, total, limit, offset)
+
+    def stream_data(self, request, *filters, sortby=None, batch=None,
+                    session=None, **params):
+        """Generator of JSON serializable objects for all models satisfying
+        ``filters`` and ``params``, without pagination.
+
+        Rows are fetched from the backend ``batch`` at a time so that
+        large results are never held in memory at once
+        """
+        with self.session(request, session=session) as session:
+            query = self.query(request, session, *filters, **params)
+            query = query.sortby(sortby)
+            yield from query.iter_json(request, batch=batch, **params)
 
     def meta(self, request, *filters, exclude=None, session=None,
-             check_permission=None, **params):
+             check_permission=None, count=None, **params):
         """Return an object representing the metadata for the model
         served by this router
         """
@@ -384,7 +461,9 @@ class RestModel(LuxModel, RestClient):
 
         with self.session(request, session=session) as session:
             query = self.query(request, session, *filters, **params)
-            meta['total'] = query.count()
+            total = self.query_count(request, query, count)
+        if total is not None:
+            meta['total'] = total
         return meta
 
     def add_related_field(self, name, model, field=None, **kw):
@@ -403,6 +482,39 @@ class RestModel(LuxModel, RestClient):
                                self._html_url,
                                request.config.get('WEB_SITE_URL'))
 
+    def _cursor_data(self, request, pagination, query, limit, sortby, cursor,
+                     count, **params):
+        sortby = _cursor_sortby(self, sortby)
+        position = pagination.decode_cursor(cursor, len(sortby))
+        values, backward = position or (None, False)
+        total = None
+        if pagination.count or count:
+            total = self.query_count(request, query, count)
+        query = query.seek(sortby, values, backward).limit(limit + 1)
+        instances = list(query.all())
+        more = len(instances) > limit
+        instances = instances[:limit]
+        if backward:
+            instances.reverse()
+        data = []
+        for instance in instances:
+            try:
+                data.append(self.tojson(request, instance, in_list=True,
+                                        **params))
+            except ModelNotAvailable:
+                continue
+        next = prev = None
+        if instances:
+            if more or backward:
+                values = [self.get_instance_value(instances[-1], name)
+                          for name, _ in sortby]
+                next = pagination.encode_cursor(values)
+            if (more and backward) or (position and not backward):
+                values = [self.get_instance_value(instances[0], name)
+                          for name, _ in sortby]
+                prev = pagination.encode_cursor(values, True)
+        return pagination(request, data, total, limit, next=next, prev=prev)
+
     def _load_fields_map(self, rest):
         """List of column definitions
         """
@@ -434,7 +546,50 @@ class RestModel(LuxModel, RestClient):
 
 class DictModel(RestModel):
     """A rest model with instances given by python dictionaries
+
+    .. attribute:: indexes
+
+        Optional dictionary mapping field names to index types, ``hash``
+        for equality filters or ``sorted`` for equality and range filters.
+        Indexes are built when a dataset is loaded via the :meth:`dataset`
+        method, which queries use when their
+        :meth:`~.Query.dataset_key` is not ``None``
     """
+    indexes = None
+
+    def __init__(self, name, indexes=None, **kw):
+        super().__init__(name, **kw)
+        self.indexes = dict(indexes or self.indexes or ())
+        self._datasets = {}
+
+    def dataset(self, key, loader, timeout=None, version=None):
+        """Return the indexed :class:`.Dataset` for ``key``
+
+        :param loader: a callable returning the list of entries of the
+            dataset, invoked when the dataset is not available or expired
+        :param timeout: optional number of seconds the dataset is kept for
+        :param version: optional version of the data, the dataset is
+            reloaded when it changes
+        """
+        dataset, expiry, loaded = self._datasets.get(key, (None, None, None))
+        now = time.monotonic()
+        if (dataset is None or loaded != version or
+                (expiry is not None and expiry < now)):
+            dataset = Dataset(self, loader())
+            dataset.build_indexes(self.indexes)
+            expiry = now + timeout if timeout else None
+            self._datasets[key] = (dataset, expiry, version)
+        return dataset
+
+    def refresh(self, key=None):
+        """Remove loaded datasets so that they are reloaded, and their
+        indexes rebuilt, at the next query
+        """
+        if key is None:
+            self._datasets.clear()
+        else:
+            self._datasets.pop(key, None)
+
     def session(self, request, session=None):
         return session or RestSession(self, request)
 
@@ -492,6 +647,27 @@ class DictModel(RestModel):
             return value
 
 
+def _cursor_sortby(model, sortby):
+    fields = model.fields()
+    if not sortby:
+        sortby = ()
+    elif not isinstance(sortby, list):
+        sortby = (sortby,)
+    entries = []
+    id_direction = 'asc'
+    for entry in sortby:
+        name, _, direction = entry.partition(':')
+        direction = 'desc' if direction == 'desc' else 'asc'
+        if name == model.id_field:
+            id_direction = direction
+            break
+        elif name in fields:
+            entries.append((name, direction))
+    # the id makes the sort key unique
+    entries.append((model.id_field, id_direction))
+    return entries
+
+
 def get_offset(offset=None):
     try:
         offset = int(offset)
@@ -1,7 +1,15 @@
+import json
+import base64
+import binascii
+from enum import Enum
+
+from pulsar import BadRequest
 from pulsar.utils.httpurl import iri_to_uri
 
 
 class Pagination:
+    cursor = False
+    """True when pages are located by a cursor rather than an offset"""
 
     def first_link(self, request, total, limit, offset):
         n = self._count_part(offset, limit, 0)
@@ -35,12 +43,16 @@ class Pagination:
         return request.absolute_uri(location)
 
     def __call__(self, request, result, total=None, limit=None, offset=None):
-        if total is None:
+        """Paginated data
+
+        When ``total`` is ``None`` and ``limit`` is given the total is
+        unknown and the ``last`` link is not available
+        """
+        if total is None and limit is None:
             total = len(result)
             offset = 0
             limit = total or 1
         data = {
-            'total': total,
             'result': result
         }
         first = self.first_link(request, total, limit, offset)
@@ -50,6 +62,14 @@ class Pagination:
             if prev != first:
                 data['prev'] = prev
 
+        if total is None:
+            next = self.next_link(request, _more(result, limit, offset),
+                                  limit, offset)
+            if next:
+                data['next'] = next
+            return data
+
+        data['total'] = total
         next = self.next_link(request, total, limit, offset)
         if next:
             last = self.last_link(request, total, limit, offset)
@@ -77,11 +97,89 @@ class GithubPagination(Pagination):
             prev = self.prev_link(request, total, limit, offset)
             if prev != first:
                 links.append(prev)
-        next = self.next_link(request, total, limit, offset)
-        if next:
-            last = self.last_link(request, total, limit, offset)
-            if last != next:
+        if total is None:
+            next = self.next_link(request, _more(result, limit, offset),
+                                  limit, offset)
+            if next:
                 links.append(next)
-            links.append(last)
+        else:
+            next = self.next_link(request, total, limit, offset)
+            if next:
+                last = self.last_link(request, total, limit, offset)
+                if last != next:
+                    links.append(next)
+                links.append(last)
         request.response['links'] = links
         return result
+
+
+class CursorPagination(Pagination):
+    """Keyset pagination
+
+    Pages are located by an opaque cursor encoding the sort values and
+    the id of the first or last element of the current page, so that
+    fetching deep pages does not require to scan all previous elements.
+    The total number of elements is not computed unless :attr:`count`
+    is ``True``.
+    """
+    cursor = True
+    count = False
+
+    def encode_cursor(self, values, backward=False):
+        data = json.dumps([int(backward)] + list(values), default=_json_value)
+        data = base64.urlsafe_b64encode(data.encode('utf-8'))
+        return data.decode('utf-8').rstrip('=')
+
+    def decode_cursor(self, cursor, size):
+        """Decode a ``cursor`` into a two elements tuple, the list of
+        ``size`` sort values and a flag indicating if paging backward
+        """
+        if not cursor:
+            return
+        try:
+            data = cursor.encode('utf-8')
+            data = base64.urlsafe_b64decode(data + b'=' * (-len(data) % 4))
+            data = json.loads(data.decode('utf-8'))
+        except (binascii.Error, UnicodeError, ValueError):
+            data = None
+        if not isinstance(data, list) or len(data) != size + 1:
+            raise BadRequest('Invalid pagination cursor')
+        return data[1:], bool(data[0])
+
+    def link(self, request, cursor, limit):
+        params = request.url_data.copy()
+        cfg = request.config
+        params.pop(cfg['API_OFFSET_KEY'], None)
+        params.update({cfg['API_CURSOR_KEY']: cursor,
+                       cfg['API_LIMIT_KEY']: limit})
+        location = iri_to_uri(request.path, params)
+        return request.absolute_uri(location)
+
+    def __call__(self, request, result, total=None, limit=None,
+                 next=None, prev=None):
+        if total is None and limit is None:
+            total = len(result)
+        data = {'result': result}
+        if total is not None:
+            data['total'] = total
+        if prev:
+            data['prev'] = self.link(request, prev, limit)
+        if next:
+            data['next'] = self.link(request, next, limit)
+        return data
+
+
+def _more(result, limit, offset):
+    """Lower bound of the total when unknown: a full page may be followed
+    by other elements
+    """
+    total = offset + len(result)
+    return total + 1 if len(result) >= limit else total
+
+
+def _json_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    elif isinstance(value, Enum):
+        return value.name
+    return str(value)
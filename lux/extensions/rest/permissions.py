@@ -1,4 +1,6 @@
+import json
 from itertools import chain
+from functools import lru_cache
 
 from lux.core.auth import ACTIONS
 from lux.core import cached
@@ -17,6 +19,8 @@ POLICY = dict(effect=(str, frozenset(('allow', 'deny'))),
 EFFECTS = {'allow': True,
            'deny': False}
 
+ANY = '*'
+
 
 class PemissionsMixin:
     """Implements the ``has_permission`` and ``get_permissions``
@@ -28,9 +32,8 @@ class PemissionsMixin:
         if user.is_superuser():
             return True
         else:
-            # Get permissions list for the current request
-            policies = self.get_permission_policies(request)
-            return has_permission(request, policies, resource, action)
+            engine = self.policy_engine(request)
+            return engine.has_permission(request, resource, action)
 
     def get_permissions(self, request, resources, actions=None):
         if not actions:
@@ -43,13 +46,8 @@ class PemissionsMixin:
         obj = {}
 
         if not request.cache.user.is_superuser():
-            permissions = self.get_permission_policies(request)
-            for resource in resources:
-                perms = {}
-                for action in actions:
-                    perms[action] = has_permission(request, permissions,
-                                                   resource, action)
-                obj[resource] = perms
+            engine = self.policy_engine(request)
+            obj = engine.get_permissions(request, resources, actions)
 
         else:
             for resource in resources:
@@ -57,6 +55,21 @@ class PemissionsMixin:
 
         return obj
 
+    def policy_engine(self, request):
+        """The :class:`.PolicyEngine` for the current request
+
+        Policies are compiled once for each distinct set of policy documents
+        """
+        user = request.cache.user
+        cache = request.cache.policy_engine
+        if cache and cache[0] is user:
+            return cache[1]
+        policies = chain(self.get_permission_policies(request),
+                         request.config['DEFAULT_POLICY'])
+        engine = compile_policies(list(policies))
+        request.cache.policy_engine = (user, engine)
+        return engine
+
     @cached(user=True)
     def get_permission_policies(self, request):
         """Returns a list of permission policy documents for the
@@ -95,80 +108,158 @@ def user_permissions(request):
 def has_permission(request, policies, resource, action):
     '''Check for permission to perform an ``action`` on a ``resource``
 
-    :param permissions: dictionary or permissions
+    :param policies: list of policy documents
     :param resource: resource string, colon separated
     :param action: action to check permission for
     '''
-    namespaces = resource.split(':')
-    available_policies = []
-    #
-    # First select appropriate policies
-    for policy in chain(policies, request.config['DEFAULT_POLICY']):
-        resources = policy.get('resource')
-        if resources and _has_policy_actions(action, policy.get('action')):
+    policies = list(chain(policies, request.config['DEFAULT_POLICY']))
+    engine = compile_policies(policies)
+    return engine.has_permission(request, resource, action)
+
+
+def compile_policies(policies):
+    """Return the :class:`.PolicyEngine` for a list of ``policies``
+
+    Engines are cached by the content of the policies so that users
+    sharing the same groups share the same engine
+    """
+    return _compile_policies(json.dumps(policies, sort_keys=True,
+                                        default=str))
+
+
+@lru_cache(maxsize=256)
+def _compile_policies(policies):
+    return PolicyEngine(json.loads(policies))
+
+
+class PolicyNode:
+    __slots__ = ('children', 'rules')
+
+    def __init__(self):
+        self.children = {}
+        self.rules = []
+
+
+class PolicyEngine:
+    """Policy documents compiled into a trie of resource segments
+
+    Each resource of a policy is a path in the trie, ``*`` segments are
+    wildcard nodes. Rules are stored in the node at the end of the path
+    as ``(order, effect, actions, condition, code)`` tuples where
+    ``actions`` is a set of lower case actions (``None`` for all actions)
+    and ``code`` is the compiled condition.
+    """
+    def __init__(self, policies):
+        self.root = PolicyNode()
+        order = 0
+        for policy in policies:
+            resources = policy.get('resource')
+            if not resources:
+                continue
+            actions = _policy_actions(policy.get('action'))
+            if actions is not None and not actions:
+                continue
             effect = EFFECTS.get(policy.get('effect', 'allow'))
             condition = policy.get('condition')
+            code = _compile_condition(condition) if condition else None
             if not isinstance(resources, list):
                 resources = (resources,)
-            for available_resource in resources:
-                bits = available_resource.split(':')
-                if len(bits) > len(namespaces):
-                    continue
-                available_policies.append((bits, effect, condition))
+            for resource in resources:
+                node = self.root
+                for bit in resource.split(':'):
+                    child = node.children.get(bit)
+                    if child is None:
+                        child = node.children[bit] = PolicyNode()
+                    node = child
+                node.rules.append((order, effect, actions, condition, code))
+                order += 1
 
-    if not available_policies:
-        return False
+    def has_permission(self, request, resource, action):
+        context = _policy_context(request)
+        return self._has_permission(request, resource, action,
+                                    self.matches(resource), context)
 
-    context = {
-        'user': request.cache.user,
-        'env': request.cache
-    }
+    def get_permissions(self, request, resources, actions):
+        """Permissions for several ``resources`` and ``actions``
 
-    while namespaces:
-        has = {}
-        for policy, effect, condition in available_policies:
-            if len(policy) != len(namespaces):
-                continue
+        The trie is walked once for each resource
+        """
+        context = _policy_context(request)
+        obj = {}
+        for resource in resources:
+            levels = self.matches(resource)
+            obj[resource] = dict(((action,
+                                   self._has_permission(request, resource,
+                                                        action, levels,
+                                                        context))
+                                  for action in actions))
+        return obj
 
-            match = {}
-            count = 0
-            for a, b in zip(namespaces, policy):
-                if a == b:
-                    continue
-                elif b == '*':
-                    match[count] = a
-                    count += 1
-                else:
-                    match = False
-                    break
-
-            if match is False:  # No match
-                continue
+    def matches(self, resource):
+        """Rules matching ``resource``
 
-            if condition:
-                local = {'match': match}
-                try:
-                    if not eval(condition, context, local):
-                        continue
-                except Exception as exc:
-                    request.logger.error(
-                        'Could not evaluate policy condition "%s" '
-                        'on resource "%s": %s',
-                        condition, resource, exc)
+        :return: a list, with an element for each segment of the resource,
+            of lists of ``(rule, captured)`` pairs, where ``captured`` are
+            the segments matched by wildcards. Rules are in policy order.
+        """
+        namespaces = resource.split(':')
+        size = len(namespaces)
+        levels = [[] for _ in namespaces]
+        stack = [(self.root, 0, ())]
+        while stack:
+            node, depth, captured = stack.pop()
+            if depth:
+                levels[depth-1].extend(((rule, captured)
+                                        for rule in node.rules))
+            if depth == size:
+                continue
+            segment = namespaces[depth]
+            child = node.children.get(segment)
+            if child is not None:
+                stack.append((child, depth + 1, captured))
+            if segment != ANY:
+                child = node.children.get(ANY)
+                if child is not None:
+                    stack.append((child, depth + 1, captured + (segment,)))
+        for level in levels:
+            if len(level) > 1:
+                level.sort(key=_rule_order)
+        return levels
+
+    def _has_permission(self, request, resource, action, levels, context):
+        # The most specific resource wins, then the rule with the least
+        # number of wildcards. A deny without wildcards wins straight away
+        action = action.lower() if isinstance(action, str) else None
+        for level in reversed(levels):
+            has = {}
+            for rule, captured in level:
+                _, effect, actions, condition, code = rule
+                if actions is not None and action not in actions:
+                    continue
+                match = dict(enumerate(captured))
+                if condition:
+                    try:
+                        if isinstance(code, Exception):
+                            raise code
+                        if not eval(code, context, {'match': match}):
+                            continue
+                    except Exception as exc:
+                        request.logger.error(
+                            'Could not evaluate policy condition "%s" '
+                            'on resource "%s": %s',
+                            condition, resource, exc)
+                        return False
+
+                if not match and not effect:
                     return False
 
-            if not match and not effect:
-                return False
-
-            if has.get(len(match)) is not False:
-                has[len(match)] = effect
-
-        if has:
-            return has[sorted(has)[0]]
+                if has.get(len(match)) is not False:
+                    has[len(match)] = effect
 
-        namespaces.pop()
+            if has:
+                return has[min(has)]
 
-    return False
+        return False
 
 
 def validate_policy(policy):
@@ -215,12 +306,35 @@ def validate_single_policy(policy):
     return p
 
 
-def _has_policy_actions(action, actions):
-    if actions == '*':
-        return True
+def _policy_actions(actions):
+    """Set of lower case actions, ``None`` for all actions"""
+    if actions == ANY:
+        return None
     elif isinstance(actions, (list, tuple)):
-        for act in actions:
-            if _has_policy_actions(action, act):
-                return True
-    elif isinstance(action, str) and isinstance(actions, str):
-        return action.lower() == actions.lower()
+        result = set()
+        for action in actions:
+            action = _policy_actions(action)
+            if action is None:
+                return None
+            result.update(action)
+        return frozenset(result)
+    elif isinstance(actions, str):
+        return frozenset((actions.lower(),))
+    else:
+        return frozenset()
+
+
+def _compile_condition(condition):
+    try:
+        return compile(condition, '<policy condition>', 'eval')
+    except Exception as exc:
+        return exc
+
+
+def _policy_context(request):
+    return {'user': request.cache.user,
+            'env': request.cache}
+
+
+def _rule_order(match):
+    return match[0][0]
@@ -1,4 +1,10 @@
-from pulsar import Http404
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+from datetime import date, datetime
+
+from dateutil.parser import parse as dateparser
+
+from pulsar import Http404, BadRequest
 
 from lux.core import Query as BaseQuery
 
@@ -35,11 +41,116 @@ class RestSession:
         pass
 
 
+class HashIndex:
+    """Map column values to row positions, for equality filters
+    """
+    def __init__(self, column):
+        self.index = index = {}
+        for i, value in enumerate(column):
+            try:
+                index.setdefault(value, []).append(i)
+            except TypeError:   # not hashable
+                continue
+
+    def select(self, op, values):
+        if op != 'eq':
+            return
+        rows = set()
+        index = self.index
+        for value in values:
+            try:
+                rows.update(index.get(value, ()))
+            except TypeError:
+                return
+        return rows
+
+
+class SortedIndex:
+    """Row positions sorted by column values, for equality and range
+    filters. ``None`` values are not indexed
+    """
+    def __init__(self, column):
+        pairs = sorted(((v, i) for i, v in enumerate(column) if v is not None),
+                       key=itemgetter(0))
+        self.values = [v for v, _ in pairs]
+        self.rows = [i for _, i in pairs]
+
+    def select(self, op, values):
+        keys, rows = self.values, self.rows
+        try:
+            if op == 'eq':
+                if None in values:
+                    return
+                selected = set()
+                for value in values:
+                    selected.update(rows[bisect_left(keys, value):
+                                         bisect_right(keys, value)])
+                return selected
+            elif op == 'gt':
+                return set(rows[bisect_right(keys, min(values)):])
+            elif op == 'ge':
+                return set(rows[bisect_left(keys, min(values)):])
+            elif op == 'lt':
+                return set(rows[:bisect_left(keys, max(values))])
+            elif op == 'le':
+                return set(rows[:bisect_right(keys, max(values))])
+        except TypeError:
+            return
+
+
+INDEXES = {
+    'hash': HashIndex,
+    'sorted': SortedIndex
+}
+
+
+class Dataset:
+    """A columnar view of a list of entries (dictionaries)
+
+    Columns are built once per field, when first needed, with values
+    converted by the model fields. Queries select rows by position.
+    """
+    def __init__(self, model, entries):
+        self.model = model
+        self.entries = entries
+        self.columns = {}
+        self.indexes = {}
+
+    def build_indexes(self, indexes):
+        """Build ``indexes``, a dictionary mapping field names to index
+        types (``hash`` or ``sorted``)
+        """
+        for name, kind in indexes.items():
+            try:
+                self.indexes[name] = INDEXES[kind](self.column(name))
+            except TypeError:   # values cannot be sorted
+                self.model.app.logger.warning(
+                    'Could not build %s index for %s.%s', kind, self.model,
+                    name)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def column(self, name):
+        column = self.columns.get(name)
+        if column is None:
+            field = self.model.field(name)
+            if field:
+                value = field.value
+                column = [value(entry.get(name)) for entry in self.entries]
+            else:
+                column = [entry.get(name) for entry in self.entries]
+            self.columns[name] = column
+        return column
+
+
 class Query(BaseQuery):
     _data = None
     _limit = None
     _offset = None
-    _filtered_data = None
+    _seek = None
+    _dataset = None
+    _rows = None
 
     def __init__(self, model, request):
         super().__init__(model)
@@ -77,102 +188,192 @@ class Query(BaseQuery):
         return self
 
     def count(self):
-        return len(self.all())
+        return len(self._slice())
 
     def filter_args(self, args):
         self.request.logger.error('Cannot filter positional arguments for '
                                   'model %s.' % self.name)
 
     def filter_field(self, field, op, value):
-        self._filtered_data = None
+        self._rows = None
         if op in OPERATORS:
-            self._filters.append((field, OPERATORS[op], value))
+            if not isinstance(value, (list, tuple)):
+                value = (value,)
+            self._filters.append((field, op, value))
         else:
             self.request.logger.error('Could not apply filter %s to %s',
                                       op, self)
 
     def sortby_field(self, field, direction):
+        self._rows = None
         self._sortby.append((field, direction))
 
-    def all(self):
-        data = self._filtered_data
-        if data is None:
-            model = self.model
-            self._filtered_data = data = []
-            for entry in self._get_data():
-                if self._filter(entry):
-                    data.append(model.instance(entry, self.fields))
-
-        for field, direction in self._sortby:
-            if direction == 'desc':
-                data = [desc(d, field) for d in data]
-            else:
-                data = [asc(d, field) for d in data]
-            data = [s.d for s in sorted(data)]
-        if self._offset:
-            data = data[self._offset:]
-        if self._limit:
-            data = data[:self._limit]
-        return data
-
-    #  INTERNALS
-    def _filter(self, entry):
-        for field, op, value in self._filters:
-            try:
-                val = field.value(entry.get(field.name))
-                if not isinstance(value, (list, tuple)):
-                    value = (value,)
-                if not any((op(val, field.value(v)) for v in value)):
-                    return False
-            except Exception:
-                return False
-        return True
-
-    def _get_data(self):
-        return []
-
-
-class asc:
-    __slots__ = ('d', 'value')
+    def seek(self, sortby, values=None, backward=False):
+        self._rows = None
+        self._seek = (sortby, values, backward)
+        return self
 
-    def __init__(self, d, field):
-        self.d = d
-        self.value = d.get(field)
+    def all(self):
+        return list(self.iter())
 
-    def __eq__(self, other):
-        return self.value == other.value
+    def iter(self, batch=None):
+        entries = self._get_dataset().entries
+        model = self.model
+        fields = self.fields
+        for i in self._slice():
+            yield model.instance(entries[i], fields)
 
-    def __lt__(self, other):
-        if self.value is None:
-            return False
-        elif other.value is None:
-            return True
-        else:
-            return self.value < other.value
-
-    def __gt__(self, other):
-        if other.value is None:
-            return False
-        elif self.value is None:
-            return True
-        else:
-            return self.value > other.value
+    def dataset_key(self):
+        """Key of the model dataset this query selects from
 
+        When not ``None`` the dataset is loaded once and kept, with its
+        indexes, by the :meth:`.DictModel.dataset` method, otherwise
+        data is loaded for each query
+        """
+        return None
 
-class desc(asc):
+    #  INTERNALS
+    def _get_data(self):
+        return []
 
-    def __gt__(self, other):
-        if self.value is None:
-            return False
-        elif other.value is None:
-            return True
-        else:
-            return self.value < other.value
+    def _get_dataset(self):
+        if self._dataset is None:
+            key = self.dataset_key()
+            if key is None:
+                self._dataset = Dataset(self.model, self._get_data())
+            else:
+                self._dataset = self.model.dataset(key, self._get_data)
+        return self._dataset
 
-    def __lt__(self, other):
-        if self.value is None:
-            return False
-        elif other.value is None:
-            return True
-        else:
-            return self.value > other.value
+    def _slice(self):
+        rows = self._select()
+        if self._offset:
+            rows = rows[self._offset:]
+        if self._limit:
+            rows = rows[:self._limit]
+        return rows
+
+    def _select(self):
+        """Positions of the selected rows, filtered and sorted
+        """
+        if self._rows is None:
+            dataset = self._get_dataset()
+            indexed, filters = None, []
+            for field, op, value in self._filters:
+                values = [field.value(v) for v in value]
+                index = dataset.indexes.get(field.name)
+                selected = index.select(op, values) if index else None
+                if selected is None:
+                    filters.append((field.name, op, values))
+                elif indexed is None:
+                    indexed = selected
+                else:
+                    indexed &= selected
+            rows = range(len(dataset)) if indexed is None else sorted(indexed)
+            for name, op, values in filters:
+                rows = _filter(dataset.column(name), rows, op, values)
+            rows = list(rows)
+            if self._seek:
+                sortby, values, backward = self._seek
+                columns = _sort(dataset, rows, sortby, backward)
+                if values is not None:
+                    fields = [self.model.field(name) for name, _ in sortby]
+                    values = [_column_value(column, rows,
+                                            field.value(v) if field else v)
+                              for field, (column, _), v
+                              in zip(fields, columns, values)]
+                    rows = _after(rows, columns, values, backward)
+            else:
+                _sort(dataset, rows, self._sortby)
+            self._rows = rows
+        return self._rows
+
+
+def _filter(column, rows, op, values):
+    if op == 'eq':
+        try:
+            values = frozenset(values)
+            return [i for i in rows if column[i] in values]
+        except TypeError:
+            pass
+    compare = OPERATORS[op]
+    selected = []
+    for i in rows:
+        value = column[i]
+        try:
+            if any((compare(value, v) for v in values)):
+                selected.append(i)
+        except Exception:
+            continue
+    return selected
+
+
+def _sort(dataset, rows, sortby, backward=False):
+    """Sort ``rows`` in place, the first field in ``sortby`` being the
+    most significant. ``None`` values are placed last, first when
+    ``backward``.
+
+    :return: a list of ``(column, reverse)`` two elements tuples
+    """
+    columns = [(dataset.column(name), (direction == 'desc') != backward)
+               for name, direction in sortby]
+    if not columns:
+        return columns
+    directions = set((reverse for _, reverse in columns))
+    if len(directions) == 1:
+        reverse = directions.pop()
+        rows.sort(key=lambda i: tuple((_key(c[i], reverse, backward)
+                                       for c, _ in columns)),
+                  reverse=reverse)
+    else:
+        # stable sorts starting from the least significant field
+        for column, reverse in reversed(columns):
+            rows.sort(key=lambda i: _key(column[i], reverse, backward),
+                      reverse=reverse)
+    return columns
+
+
+def _after(rows, columns, values, backward=False):
+    """Rows after the position given by ``values`` in sorted ``rows``
+    """
+    position = [_key(value, reverse, backward) for value, (_, reverse)
+                in zip(values, columns)]
+
+    def after(i):
+        for (column, reverse), p in zip(columns, position):
+            v = _key(column[i], reverse, backward)
+            if v != p:
+                return v < p if reverse else v > p
+        return False
+
+    return [i for i in rows if after(i)]
+
+
+def _column_value(column, rows, value):
+    """Convert a cursor ``value``, decoded from JSON, to the type of the
+    values in ``column``
+    """
+    if not isinstance(value, str):
+        return value
+    sample = next((column[i] for i in rows if column[i] is not None), None)
+    if isinstance(sample, datetime):
+        return _parse_date(value)
+    elif isinstance(sample, date):
+        value = _parse_date(value)
+        return value.date() if isinstance(value, datetime) else value
+    return value
+
+
+def _parse_date(value):
+    try:
+        return dateparser(value)
+    except (ValueError, OverflowError):
+        raise BadRequest('Invalid pagination cursor')
+
+
+def _key(value, reverse, backward=False):
+    """Sort key placing ``None`` values last, or first when ``backward``
+    """
+    if reverse == backward:
+        return (value is None, value)
+    return (value is not None, value)
@@ -0,0 +1,130 @@
+"""Streamed exports of REST models
+
+Writers encode JSON serializable model objects into chunks of text
+which are sent to the client as soon as they are available.
+"""
+import csv
+import json
+from io import StringIO
+from itertools import islice
+
+
+class NdjsonWriter:
+    """Newline delimited JSON, one object per line
+    """
+    content_type = 'application/x-ndjson'
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def header(self):
+        return ''
+
+    def rows(self, rows):
+        return ''.join('%s\n' % json.dumps(row, separators=(',', ':'))
+                       for row in rows)
+
+
+class CsvWriter:
+    """Comma separated values with a header of field names
+    """
+    content_type = 'text/csv'
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.buffer = StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def header(self):
+        self.writer.writerow(self.fields)
+        return self._flush()
+
+    def rows(self, rows):
+        writerow = self.writer.writerow
+        fields = self.fields
+        for row in rows:
+            writerow([csv_value(row, name) for name in fields])
+        return self._flush()
+
+    def _flush(self):
+        text = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return text
+
+
+EXPORT_WRITERS = dict(((w.content_type, w) for w in (NdjsonWriter,
+                                                     CsvWriter)))
+
+
+def csv_value(row, name):
+    value = row.get(name)
+    if value is None:
+        value = row.get('%s[]' % name)
+    if isinstance(value, dict):
+        value = value.get('repr', value.get('id'))
+    elif isinstance(value, list):
+        value = json.dumps(value)
+    return value
+
+
+def export_chunks(request, writer, rows, batch):
+    """Generator of encoded chunks, each one with at most ``batch`` rows.
+
+    The cache of related model representations is cleared after each chunk
+    so that memory does not grow with the size of the export. When closed,
+    the generator closes ``rows`` so that the database session reading
+    them is released even if the client disconnects
+    """
+    rows = iter(rows)
+    try:
+        chunk = writer.header()
+        while True:
+            text = writer.rows(islice(rows, batch))
+            request.cache.id_reprs = None
+            if not text:
+                break
+            yield (chunk + text).encode('utf-8')
+            chunk = ''
+        if chunk:
+            yield chunk.encode('utf-8')
+    finally:
+        close = getattr(rows, 'close', None)
+        if close:
+            close()
+
+
+def green_chunks(pool, chunks):
+    """Produce ``chunks`` in the green ``pool``.
+
+    Chunks require database access, which must run in a green worker, so
+    this generator yields futures, each resolving to the next chunk. The
+    server waits for each future before asking for the next one.
+
+    The response closes this generator when done or when the client
+    disconnects, ``chunks`` are then closed in the green ``pool`` once the
+    pending chunk, if any, is produced
+    """
+    done = []
+    future = None
+
+    def next_chunk():
+        try:
+            return next(chunks)
+        except StopIteration:
+            done.append(True)
+            return b''
+
+    def close(*args):
+        pool.submit(chunks.close)
+
+    try:
+        while not done:
+            future = pool.submit(next_chunk)
+            yield future
+    finally:
+        if not done:
+            if future is None or future.done():
+                close()
+            else:
+                future.add_done_callback(close)
@@ -1,10 +1,14 @@
-from pulsar import MethodNotAllowed, Http404
+from collections import Mapping
+
+from pulsar import MethodNotAllowed, Http404, BadRequest
 from pulsar.apps.wsgi import route
 
-from lux.core import JsonRouter, GET_HEAD, Resource
+from lux.core import JsonRouter, GET_HEAD, Resource, LuxModel
 from lux.forms import get_form_class, ValidationError
+from lux.utils.messages import error_message
 
 from ..models import RestModel
+from .export import EXPORT_WRITERS, export_chunks, green_chunks
 
 
 REST_CONTENT_TYPES = ['application/json']
@@ -12,6 +16,12 @@ DIRECTIONS = ('asc', 'desc')
 POST_PUT_PATCH = frozenset(('POST', 'PUT', 'PATCH'))
 VERBS_CHECK = frozenset(('POST', 'PUT', 'PATCH', 'DELETE', 'TRACE'))
 CREATE_MODEL_ERROR_MSG = 'Could not create model'
+BULK_ACTIONS = ('create', 'update', 'delete')
+BULK_ERROR_MSG = 'Could not update models'
+
+
+class BulkFlushError(Exception):
+    '''Raised when flushing the changes of a bulk request fails'''
 
 
 class RestRoot(JsonRouter):
@@ -105,6 +115,8 @@ class RestRouter(JsonRouter):
         params.update(request.url_data)
         params['limit'] = params.pop(cfg['API_LIMIT_KEY'], None)
         params['offset'] = params.pop(cfg['API_OFFSET_KEY'], None)
+        params['cursor'] = params.pop(cfg['API_CURSOR_KEY'], None)
+        params['count'] = params.pop(cfg['API_COUNT_KEY'], None)
         params['search'] = params.pop(cfg['API_SEARCH_KEY'], None)
         params['check_permission'] = check_permission
         if model is None:
@@ -134,13 +146,17 @@ class MetadataMixin:
             return request.response
         filters, params = self.filters_params(request)
         model = self.get_model(request)
-
+        check_permission = Resource.rest(request, 'read', model.fields(),
+                                         pop=1, list=True)
+        # fetch permissions needed by the metadata in one call
+        request.cache.auth_backend.prefetch_permissions(
+            request, check_permission.resources() + [model.name]
+        )
         meta = model.meta(
             request,
             *filters,
-            check_permission=Resource.rest(request, 'read',
-                                           model.fields(),
-                                           pop=1, list=True),
+            check_permission=check_permission,
+            count=request.url_data.get(request.config['API_COUNT_KEY']),
             **params
         )
         return self.json_response(request, meta)
@@ -151,18 +167,56 @@ class CRUD(MetadataMixin, RestRouter):
 
     This class adds routes to the :class:`.RestRouter`
     '''
+    response_content_types = REST_CONTENT_TYPES + list(EXPORT_WRITERS)
+
     def get(self, request):
         '''Get a list of models
+
+        When the client accepts ``application/x-ndjson`` or ``text/csv``
+        all models are streamed, see :meth:`export`
         '''
         model = self.get_model(request)
-        data = self.get_list(
-            request,
-            check_permission=Resource.rest(request, 'read',
-                                           model.fields(),
-                                           list=True)
-        )
+        check_permission = Resource.rest(request, 'read',
+                                         model.fields(),
+                                         list=True)
+        writer = EXPORT_WRITERS.get(request.response.content_type)
+        if writer:
+            return self.export(request, writer,
+                               check_permission=check_permission)
+        data = self.get_list(request, check_permission=check_permission)
         return self.json_response(request, data)
 
+    def export(self, request, writer, *filters, check_permission=None,
+               **params):
+        '''Stream all models satisfying user queries, without pagination
+
+        Rows are fetched from the database and written to the response
+        ``API_EXPORT_BATCH`` at a time
+        '''
+        cfg = request.config
+        params.update(request.url_data)
+        for key in ('API_LIMIT_KEY', 'API_OFFSET_KEY', 'API_CURSOR_KEY',
+                    'API_COUNT_KEY'):
+            params.pop(cfg[key], None)
+        params['search'] = params.pop(cfg['API_SEARCH_KEY'], None)
+        params['check_permission'] = check_permission
+        filters, params = self.filters_params(request, *filters, **params)
+        model = self.get_model(request)
+        if check_permission:
+            fields = check_permission(request)
+        else:
+            fields = tuple(model.fields())
+        batch = cfg['API_EXPORT_BATCH']
+        rows = model.stream_data(request, *filters, batch=batch, **params)
+        chunks = export_chunks(request, writer(fields), rows, batch)
+        pool = request.app.green_pool
+        if pool:
+            chunks = green_chunks(pool, chunks)
+        response = request.response
+        response.content_type = writer.content_type
+        response.content = chunks
+        return response
+
     def post(self, request):
         '''Create a new model
         '''
@@ -201,6 +255,189 @@ class CRUD(MetadataMixin, RestRouter):
         return self.json_response(request, data)
 
     # Additional Routes
+    @route('_bulk', position=90, method=('post', 'options'))
+    def bulk(self, request):
+        '''Create, update and delete several models in one request
+
+        The body is a JSON array of items with an ``action`` (``create``,
+        ``update`` or ``delete``; it defaults to ``update`` when the item
+        has an ``id`` and to ``create`` otherwise), the ``id`` of the model
+        to update or delete and the model ``data``.
+
+        All items are validated before any change is made and changes are
+        flushed to the database once. When any item is invalid nothing is
+        changed and the response contains the errors for each item. When
+        the database rejects the changes nothing is changed either and the
+        response contains the error message only.
+        '''
+        if request.method == 'OPTIONS':
+            request.app.fire('on_preflight', request, methods=['POST'])
+            return request.response
+
+        model = self.get_model(request)
+        items, _ = request.data_and_files()
+        if not isinstance(items, list):
+            raise BadRequest('Expected a list of items')
+        if len(items) > request.config['API_BULK_LIMIT']:
+            raise BadRequest('Too many items, the limit is %d' %
+                             request.config['API_BULK_LIMIT'])
+
+        actions = self.bulk_actions(items)
+        # check permissions before touching the database so that
+        # unauthorized requests are reported as such
+        fields = self.bulk_permissions(request, model, actions)
+        try:
+            with model.session(request) as session:
+                # coalesce channel notifications
+                session.bulk = True
+                operations = self.bulk_operations(request, model, items,
+                                                  actions, fields, session)
+                if any(op[3] for op in operations):
+                    request.response.status_code = 422
+                    data = error_message(BULK_ERROR_MSG)
+                    data['result'] = [op[3] for op in operations]
+                else:
+                    data = {'result': self.bulk_apply(request, model,
+                                                      operations, session)}
+        except ValidationError as exc:
+            request.response.status_code = 422
+            data = error_message(str(exc) or BULK_ERROR_MSG)
+        except BulkFlushError:
+            # the database rejected the changes, for example because of
+            # an integrity error; the session has been rolled back
+            request.logger.exception(BULK_ERROR_MSG)
+            request.response.status_code = 422
+            data = error_message(BULK_ERROR_MSG)
+
+        return self.json_response(request, data)
+
+    def bulk_actions(self, items):
+        '''The action of each item of a bulk request, ``None`` for items
+        which are not objects
+        '''
+        actions = []
+        for item in items:
+            action = None
+            if isinstance(item, Mapping):
+                action = item.get('action')
+                if not action:
+                    action = 'create' if item.get('id') is None else 'update'
+            actions.append(action)
+        return actions
+
+    def bulk_permissions(self, request, model, actions):
+        '''Check permissions for the ``actions`` of a bulk request
+
+        :return: a dictionary of permitted field names keyed by action
+        '''
+        return dict(((action, Resource.rest(request, action, model.fields(),
+                                            pop=1, list=True)(request))
+                     for action in BULK_ACTIONS if action in actions))
+
+    def bulk_operations(self, request, model, items, actions, fields,
+                        session):
+        '''Validate items of a bulk request
+
+        Models to update or delete are loaded with one query for each
+        action.
+
+        :return: a list of ``(action, instance, data, errors)`` tuples,
+            one for each item
+        '''
+        ids = dict(((action, []) for action in BULK_ACTIONS))
+        for action, item in zip(actions, items):
+            if action in BULK_ACTIONS and action != 'create':
+                ids[action].append(item.get('id'))
+
+        instances = {}
+        for action in ('update', 'delete'):
+            if ids[action]:
+                instances[action] = self.bulk_instances(request, model,
+                                                        ids[action],
+                                                        fields[action],
+                                                        session)
+
+        operations = []
+        for action, item in zip(actions, items):
+            if not action:
+                operations.append((action, None, None,
+                                   error_message('Expected an object')))
+                continue
+            if action not in BULK_ACTIONS:
+                operations.append((action, None, None, error_message(
+                    'Unknown action "%s"' % action)))
+                continue
+            instance = None
+            if action == 'create':
+                instance = model.instance(fields=fields[action])
+            else:
+                id = item.get('id')
+                instance = instances[action].get(str(id))
+                if instance is None:
+                    operations.append((action, None, None, error_message(
+                        'Model "%s" not available' % id)))
+                    continue
+                if action == 'delete':
+                    operations.append((action, instance, None, None))
+                    continue
+            form_class = get_form_class(
+                request, model.form if action == 'create' else model.updateform
+            )
+            if not form_class:
+                operations.append((action, None, None, error_message(
+                    'Cannot %s models' % action)))
+                continue
+            form = form_class(request, data=item.get('data') or {},
+                              model=model,
+                              previous_state=(instance if action == 'update'
+                                              else None))
+            if form.is_valid(exclude_missing=action == 'update'):
+                operations.append((action, instance, form.cleaned_data, None))
+            else:
+                operations.append((action, instance, None, form.tojson()))
+        return operations
+
+    def bulk_instances(self, request, model, ids, fields, session):
+        '''Load models to update or delete in a bulk request
+
+        :param fields: the permitted field names to load
+        :return: a dictionary of instances keyed by string ids
+        '''
+        instances = model.get_list(request, session=session,
+                                   load_only=fields,
+                                   **{model.id_field: ids})
+        return dict(((str(model.get_instance_value(instance, model.id_field)),
+                      instance) for instance in instances))
+
+    def bulk_apply(self, request, model, operations, session):
+        '''Apply validated bulk ``operations`` and flush the session once
+
+        :return: a list with the JSON representation of each model, only the
+            id for deleted models
+        '''
+        default_create = type(model).create_model is LuxModel.create_model
+        result = []
+        for action, instance, data, _ in operations:
+            if action == 'delete':
+                id = model.get_instance_value(instance, model.id_field)
+                model.delete_model(request, instance, session=session)
+                instance = {'id': id}
+            elif action == 'create' and not default_create:
+                # the model has a custom create method
+                instance = model.create_model(request, instance, data,
+                                              session=session)
+            else:
+                instance = model.update_model(request, instance, data,
+                                              session=session)
+            result.append(instance)
+        try:
+            session.flush()
+        except Exception as exc:
+            raise BulkFlushError from exc
+        return [o if isinstance(o, dict) else
+                model.tojson(request, o, in_list=True)
+                for o in result]
+
     @route('<id>',
            position=100,
            method=('get', 'patch', 'post', 'put', 'delete', 'head', 'options'))
@@ -32,6 +32,11 @@ class Extension(LuxExtension):
                   'Expiry for a session/token in seconds.'),
         Parameter('SESSION_STORE', None,
                   'Cache backend for session objects.'),
+        Parameter('SESSION_USER_CACHE_TIMEOUT', 60,
+                  'Seconds the user of a session token is cached for, '
+                  'rather than fetched from the API at every request. '
+                  'Users are cached only when changes of tokens and users '
+                  'are received via channels. 0 for no caching'),
         Parameter('APP_JWT', None,
                   'Application JWT'),
         #
@@ -1,13 +1,14 @@
 """Backends for Browser based Authentication
 """
 import time
-from functools import wraps
+from functools import wraps, partial
 
 from pulsar import Http401, PermissionDenied, Http404, HttpRedirect, BadRequest
 from pulsar.apps.wsgi import Route, wsgi_request
 
 from lux.utils.date import to_timestamp, date_from_now, iso8601
-from lux.core import app_attribute, backend_action, User
+from lux.core import app_attribute, backend_action, User, bump_namespace
+from lux.core.cache import namespace_generation
 
 from .store import session_store
 
@@ -61,6 +62,9 @@ class SessionBackend:
         """logout a user
         """
         session = request.cache.session
+        if session.token:
+            request.app.cache_server.delete(
+                session_user_key(request.app, session.token))
         try:
             request.api.authorizations.delete(token=session.token)
         except NotAuthorised:
@@ -106,7 +110,7 @@ class SessionBackend:
         token = session.token
         if token:
             try:
-                user = request.api.user.get(token=session.token).json()
+                user = self._get_user(request, token)
             except NotAuthorised:
                 request.cache.auth_backend.logout(request)
                 raise HttpRedirect(request.config['LOGIN_URL']) from None
@@ -143,6 +147,69 @@ class SessionBackend:
         return session_store(request).create(expiry=expiry,
                                              token=token)
 
+    def _get_user(self, request, token):
+        """The user of a session ``token`` from the API
+
+        Users are cached for :setting:`SESSION_USER_CACHE_TIMEOUT` seconds
+        and invalidated when tokens or users change. Without channels for
+        invalidation users are not cached, so that revoked tokens are
+        rejected immediately
+        """
+        app = request.app
+        timeout = request.config['SESSION_USER_CACHE_TIMEOUT']
+        if not timeout or not self._register_invalidation(app):
+            return request.api.user.get(token=token).json()
+        cache = app.cache_server
+        key = session_user_key(app, token)
+        data = cache.get_json(key)
+        if isinstance(data, dict) and data.get('user'):
+            user = data['user']
+            namespace = session_user_namespace(user.get('id'))
+            if data.get('generation') == namespace_generation(request,
+                                                              namespace):
+                return user
+        user = request.api.user.get(token=token).json()
+        namespace = session_user_namespace(user.get('id'))
+        data = {'user': user,
+                'generation': namespace_generation(request, namespace)}
+        cache.set_json(key, data, timeout)
+        return user
+
+    def _register_invalidation(self, app):
+        """Listen to the data model channel for tokens and users changes,
+        available only when running in a green worker
+
+        :return: ``True`` when listening
+        """
+        if getattr(self, '_invalidation', False):
+            return True
+        channel = app.config.get('CHANNEL_DATAMODEL')
+        pool = app.green_pool
+        if (not channel or app.channels is None or
+                not pool or not pool.in_green_worker):
+            return False
+        self._invalidation = True
+        for event in ('tokens.update', 'tokens.delete', 'tokens.bulk'):
+            app.channels.register(channel, event, partial(
+                self._token_changed, app))
+        for event in ('users.update', 'users.delete', 'users.bulk'):
+            app.channels.register(channel, event, partial(
+                self._user_changed, app))
+        return True
+
+    def _token_changed(self, app, channel, event, data):
+        # channel callbacks run on the event loop, cache operations
+        # are executed in the green pool
+        keys = [session_user_key(app, id) for id in changed_ids(event, data)]
+        if keys:
+            return app.green_pool.submit(app.cache_server.delete_many, keys)
+
+    def _user_changed(self, app, channel, event, data):
+        namespaces = [session_user_namespace(id)
+                      for id in changed_ids(event, data)]
+        if namespaces:
+            return app.green_pool.submit(bump_namespaces, app, namespaces)
+
     def _get_permissions(self, request, resources, actions=None):
         if not isinstance(resources, (list, tuple)):
             resources = (resources,)
@@ -163,6 +230,35 @@ class SessionBackend:
         return agent[:max_len] if agent else ''
 
 
+def session_user_key(app, token):
+    return '%s:session-user:%s' % (app.config['APP_NAME'], token)
+
+
+def session_user_namespace(user_id):
+    return 'session-user:%s' % user_id
+
+
+def bump_namespaces(app, namespaces):
+    for namespace in namespaces:
+        bump_namespace(app, namespace)
+
+
+def changed_ids(event, data):
+    """Ids of models in the ``data`` of a data model channel ``event``
+
+    Bulk events carry lists of models keyed by event
+    """
+    if not isinstance(data, dict):
+        return
+    if event.endswith('.bulk'):
+        for name in ('update', 'delete'):
+            for model in data.get(name) or ():
+                if isinstance(model, dict) and model.get('id'):
+                    yield model['id']
+    elif data.get('id'):
+        yield data['id']
+
+
 def handle_401(request, user=None):
     """When the API respond with a 401 logout and redirect to login
     """
@@ -67,6 +67,15 @@ class SessionStore:
         if obj:
             return Session(obj)
 
+    def get_many(self, ids):
+        """Get several sessions in one round-trip to the store
+
+        :return: a list of sessions, ``None`` for missing sessions
+        """
+        keys = [self.session_key(id) for id in ids]
+        return [Session(obj) if obj else None
+                for obj in self.store.get_json_many(keys)]
+
     def set(self, id, data):
         """Set session data at id
         """
@@ -30,6 +30,7 @@
 import hmac
 from struct import pack
 from random import randint
+from hashlib import pbkdf2_hmac
 from hashlib import sha1
 from hashlib import sha256
 from hashlib import sha512
@@ -37,7 +38,7 @@ from base64 import b64encode as _b64encode
 from binascii import b2a_hex as _b2a_hex
 
 
-__all__ = ['PBKDF2', 'crypt', 'encrypt', 'verify']
+__all__ = ['PBKDF2', 'pbkdf2', 'crypt', 'encrypt', 'verify', 'needs_rehash']
 
 
 _0xffffffffL = 0xffffffff
@@ -264,11 +265,30 @@ def crypt(word, salt=None, iterations=24000, digestmodule=sha256,
 
     salt = "$p5k2$%s$%x$%s" % (digest.name.lower(),  iterations, salt)
 
-    rawhash = PBKDF2(word, salt, iterations, digestmodule,
-                     secret_key=secret_key).read(digest.digest_size)
+    rawhash = pbkdf2(word, salt, iterations, digest.name,
+                     secret_key=secret_key, dklen=digest.digest_size)
     return salt + "$" + b64encode(rawhash, "./")
 
 
+def pbkdf2(passphrase, salt, iterations=24000, digest='sha256',
+           secret_key=None, dklen=None):
+    """Derive a key of ``dklen`` bytes with ``hashlib.pbkdf2_hmac``
+
+    Same result as :class:`PBKDF2` with HMAC. When a ``secret_key`` is
+    given, the HMAC key is the sha1 digest of the ``secret_key`` followed
+    by the ``passphrase``, as in :meth:`PBKDF2._pseudorandom`.
+    """
+    if isunicode(passphrase):
+        passphrase = passphrase.encode("UTF-8")
+    if isunicode(salt):
+        salt = salt.encode("UTF-8")
+    if secret_key:
+        if isunicode(secret_key):
+            secret_key = secret_key.encode('latin-1')
+        passphrase = sha1(secret_key + passphrase).digest()
+    return pbkdf2_hmac(digest, passphrase, salt, iterations, dklen)
+
+
 # Add crypt as a static method of the PBKDF2 class
 # This makes it easier to do "from PBKDF2 import PBKDF2" and still use
 # crypt.
@@ -298,4 +318,21 @@ def verify(hashpass, raw, key, salt_length=None, *args, **kwargs):
         hashpass = hashpass.decode('utf-8')
     if isinstance(raw, bytes):
         raw = raw.decode('utf-8')
-    return hashpass == crypt(raw, hashpass, secret_key=key)
+    return hmac.compare_digest(hashpass, crypt(raw, hashpass, secret_key=key))
+
+
+def needs_rehash(hashpass, iterations=24000, digestmodule=sha256,
+                 *args, **kwargs):
+    """Check if the hash stored in db was created with a digest or a
+    number of ``iterations`` different from the ones given
+    """
+    if isinstance(hashpass, bytes):
+        hashpass = hashpass.decode('utf-8')
+    bits = hashpass.split('$')
+    if len(bits) != 6 or bits[1] != 'p5k2':
+        return True
+    try:
+        return (bits[2] != digestmodule().name.lower() or
+                int(bits[3], 16) != iterations)
+    except ValueError:
+        return True
@@ -1,4 +1,7 @@
+from datetime import datetime
+
 from lux.utils import test
+from lux.extensions.auth.access import TokenAccess
 
 from tests.auth.utils import AuthUtils
 
@@ -75,3 +78,25 @@ class TestBackend(test.AppTestCase, AuthUtils):
         """Check that the RestField was overwritten properly"""
         model = self.app.models['users']
         self.assertEqual(model.field('email').type, 'email')
+
+    @test.green
+    def test_token_access(self):
+        backend = self.app.auth_backend
+        request = self.app.wsgi_request()
+        user = backend.create_user(request,
+                                   username=test.randomname(),
+                                   password='pluto',
+                                   active=True)
+        token = backend.create_token(request, user)
+        access = TokenAccess(self.app, 60)
+        when = datetime(2016, 1, 1, 12)
+        access.touch(token.id, datetime(2016, 1, 1))
+        access.touch(token.id, when)
+        self.assertEqual(len(access), 1)
+        self.assertEqual(access.flush(), 1)
+        self.assertEqual(len(access), 0)
+        self.assertEqual(access.flush(), 0)
+        odm = self.app.odm()
+        with odm.begin() as session:
+            token = session.query(odm.token).get(token.id)
+            self.assertEqual(token.last_access, when)
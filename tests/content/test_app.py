@@ -1,6 +1,9 @@
+from unittest import mock
 from urllib.parse import urlsplit
 
+from lux.core.cache import create_cache
 from lux.extensions.content.github import github_signature
+from lux.extensions.content.models import invalidate_contents
 
 from tests import content
 
@@ -31,6 +34,40 @@ class TestContentViews(content.Test):
         self.assertTrue('api_url' in data)
         self.assertEqual(urlsplit(data['api_url']).path, path)
 
+    async def test_api_list_keeps_body(self):
+        request = await self.client.get('/api/contents/blog')
+        data = self.json(request.response, 200)
+        self.assertTrue(data['result'])
+        for entry in data['result']:
+            self.assertFalse('body' in entry)
+        request = await self.client.get('/api/contents/blog/foo')
+        data = self.json(request.response, 200)
+        self.assertTrue(data['body'])
+        request = await self.client.get('/blog/foo')
+        bs = self.bs(request.response, 200)
+        self.assertTrue('Just foo' in str(bs))
+
+    def test_dataset_invalidation(self):
+        app = self.app
+        with mock.patch.object(app, 'cache_server',
+                               create_cache(app, 'memory://')):
+            dataset = self._dataset('blog')
+            self.assertTrue(dataset.indexes)
+            self.assertIs(self._dataset('blog'), dataset)
+            invalidate_contents(app)
+            self.assertIsNot(self._dataset('blog'), dataset)
+        # nothing is kept without a cache server
+        with mock.patch.object(app, 'cache_server',
+                               create_cache(app, 'dummy://')):
+            self.assertIsNot(self._dataset('blog'), self._dataset('blog'))
+
+    def _dataset(self, group):
+        request = self.app.wsgi_request()
+        model = self.app.models['contents']
+        with model.session(request) as session:
+            query = model.query(request, session, group=group)
+            return query._get_dataset()
+
     async def test_github_hook_400(self):
         payload = dict(zen='foo', hook_id='457356234')
         signature = github_signature('test12345', payload)
@@ -23,3 +23,6 @@ class Extension(base.Extension):
         Parameter('RANDOM_P', False),
         Parameter('USE_ETAGS', False, ''),
     ]
+
+    def static_context(self, app, ctx):
+        ctx['STATIC_CONTEXT_TEST'] = True
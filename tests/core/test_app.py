@@ -1,5 +1,6 @@
 from pulsar import ImproperlyConfigured
 
+from lux.core import LuxContext
 from lux.utils import test
 
 
@@ -56,3 +57,69 @@ class CommandTests(test.TestCase):
         self.assertTrue('RANDOM_P' in app.config)
         self.assertTrue('USE_ETAGS' in app.config)
         self.assertTrue('SERVE_STATIC_FILES' in app.config)
+
+    def test_template_cache(self):
+        app = self.application()
+        template = app.template('home.html')
+        self.assertTrue(template.filename)
+        self.assertTrue(template.mtime)
+        self.assertEqual(template, '{{ html_main }}\n')
+        self.assertIs(app.template('home.html'), template)
+        self.assertFalse(app.template('dfgdfgdfg.html'))
+        app.template_cache.clear()
+        self.assertIsNot(app.template('home.html'), template)
+
+    def test_jinja2_compiled_cache(self):
+        app = self.application()
+        engine = app.template_engine('jinja2')
+        self.assertEqual(engine('{{ a }}', {'a': 3}), '3')
+        self.assertIs(engine.compile('{{ a }}'), engine.compile('{{ a }}'))
+        template = app.template('home.html')
+        self.assertIs(engine.compile(template), engine.compile(template))
+        text = app.render_template('home.html', {'html_main': 'foo'})
+        self.assertEqual(text, 'foo')
+
+    def test_template_index(self):
+        app = self.application()
+        app.refresh_templates()
+        index = app.template_index
+        self.assertTrue(index)
+        self.assertTrue(index['home.html'].endswith('home.html'))
+        self.assertEqual(app.template_full_path('home.html'),
+                         index['home.html'])
+        self.assertEqual(app.template_full_path(['xyz.html', 'home.html']),
+                         index['home.html'])
+        self.assertEqual(app.template_full_path('xyz.html'), None)
+
+    def test_context_base(self):
+        app = self.application()
+        client = test.TestClient(app)
+        request, _ = client.request_start_response('get', '/')
+        base = app.context_base
+        self.assertEqual(base['APP_NAME'], app.config['APP_NAME'])
+        self.assertTrue(base['STATIC_CONTEXT_TEST'])
+        ctx = app.context(request, {'foo': 'bar'})
+        self.assertIsInstance(ctx, LuxContext)
+        self.assertIs(ctx.maps[-1], app.config)
+        self.assertIs(ctx.maps[-2], app.context_base.maps[0])
+        self.assertEqual(ctx['foo'], 'bar')
+        self.assertEqual(ctx['APP_NAME'], app.config['APP_NAME'])
+        ctx['APP_NAME'] = 'override'
+        self.assertEqual(ctx['APP_NAME'], 'override')
+        self.assertEqual(base['APP_NAME'], app.config['APP_NAME'])
+        self.assertNotIn('foo', base)
+        self.assertIs(app.context(request, ctx), ctx)
+        # config changes are visible
+        app.config['CONTEXT_BASE_TEST'] = 'changed'
+        self.assertEqual(app.context_base['CONTEXT_BASE_TEST'], 'changed')
+        app.config.pop('CONTEXT_BASE_TEST')
+
+    def test_render_chained_context(self):
+        app = self.application()
+        client = test.TestClient(app)
+        request, _ = client.request_start_response('get', '/')
+        ctx = app.context(request, {'foo': 'bar'})
+        text = app.template_engine('jinja2')(
+            '{{ foo }} {{ APP_NAME }}{% set x = 1 %}{{ x }}', ctx)
+        self.assertEqual(text, 'bar %s1' % app.config['APP_NAME'])
+        self.assertNotIn('x', app.context_base)
@@ -0,0 +1,42 @@
+from lux.core.auth import MultiAuthBackend
+from lux.utils import test
+
+
+class TestMultiAuthBackend(test.TestCase):
+    config_file = 'tests.core'
+
+    async def test_permissions_cache(self):
+        app = self.application()
+        await app.green_pool.submit(self._permissions_cache, app)
+
+    def _permissions_cache(self, app):
+        calls = []
+
+        class Backend:
+
+            def get_permissions(self, request, resources, actions=None):
+                calls.append(resources)
+                return dict(((r, dict(((a, r != 'secret') for a in actions)))
+                             for r in resources))
+
+        backend = MultiAuthBackend()
+        backend.append(Backend())
+        request = app.wsgi_request()
+        perms = backend.get_permissions(request, ['tasks', 'secret'], 'read')
+        self.assertEqual(perms, {'tasks': {'read': True},
+                                 'secret': {'read': False}})
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(backend.get_permissions(request, 'tasks', 'read'),
+                         {'tasks': {'read': True}})
+        self.assertFalse(backend.has_permission(request, 'secret', 'read'))
+        self.assertEqual(len(calls), 1)
+        # only missing resources are requested
+        backend.prefetch_permissions(request, ['tasks', 'people'], 'read')
+        self.assertEqual(calls[-1], ['people'])
+        self.assertTrue(backend.has_permission(request, 'people', 'read'))
+        self.assertEqual(len(calls), 2)
+        #
+        backend.get_permissions(request, 'tasks')
+        self.assertEqual(len(calls), 3)
+        self.assertTrue(backend.has_permission(request, 'tasks', 'delete'))
+        self.assertEqual(len(calls), 3)
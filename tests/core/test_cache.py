@@ -1,3 +1,5 @@
+import time
+import asyncio
 from unittest import skipUnless
 
 try:
@@ -5,12 +7,19 @@ try:
 except ImportError:     # pragma    nocover
     StrictRedis = None
 
+try:
+    import msgpack
+except ImportError:     # pragma    nocover
+    msgpack = None
+
 from pulsar import ImproperlyConfigured
 from pulsar.apps.test import check_server
 from pulsar.utils.string import random_string
 from pulsar.apps.data.redis.client import RedisClient
 
 from lux.utils import test
+from lux.core import cached, prefetch_cached, bump_namespace
+from lux.core.cache import namespace_generation, CacheObject
 
 from tests.config import redis_cache_server
 
@@ -70,12 +79,270 @@ class TestDummyCache(test.TestCase, LockTests):
         self.assertEqual(self.cache.name, 'dummy')
         self.assertEqual(str(self.cache), 'dummy://')
 
+    def test_namespace_generation(self):
+        request = self.app.wsgi_request()
+        gen = namespace_generation(self.app, 'foo')
+        self.assertEqual(namespace_generation(request, 'foo'), gen)
+        self.assertEqual(bump_namespace(self.app, 'foo'), gen)
+        self.assertEqual(namespace_generation(self.app, 'foo'), gen)
+
     def test_bad_url(self):
         app = self.application(CACHE_SERVER='cbjhb://')
         self.assertRaises(ImproperlyConfigured,
                           lambda: app.cache_server)
 
 
+class TestMemoryCache(test.TestCase, LockTests):
+
+    def setUp(self):
+        self.app = self.application(CACHE_SERVER='memory://?max_entries=3')
+        self.cache = self.app.cache_server
+
+    def test_memory_cache(self):
+        self.assertEqual(self.cache.name, 'memory')
+        self.assertEqual(self.cache.max_entries, 3)
+        self.assertEqual(self.cache.get('foo'), None)
+        self.cache.set('foo', 'bla')
+        self.assertEqual(self.cache.get('foo'), 'bla')
+        self.assertEqual(self.cache.delete('foo'), 1)
+        self.assertEqual(self.cache.get('foo'), None)
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['entries'], 0)
+        self.assertEqual(stats['bytes'], 0)
+
+    def test_json(self):
+        data = {'name': 'pippo', 'age': 4}
+        self.cache.set_json('json', data)
+        self.assertEqual(self.cache.get_json('json'), data)
+
+    def test_timeout(self):
+        self.cache.set('foo', 'bla', timeout=0.01)
+        self.assertEqual(self.cache.get('foo'), 'bla')
+        time.sleep(0.02)
+        self.assertEqual(self.cache.get('foo'), None)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_lru_eviction(self):
+        for key in ('a', 'b', 'c'):
+            self.cache.set(key, key)
+        self.assertEqual(self.cache.get('a'), 'a')
+        self.cache.set('d', 'd')
+        self.assertEqual(self.cache.get('b'), None)
+        self.assertEqual(self.cache.get('a'), 'a')
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_max_bytes(self):
+        cache = self.application(
+            CACHE_SERVER='memory://?max_bytes=10').cache_server
+        cache.set('a', '123456')
+        cache.set('b', '123456')
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(cache.get('b'), '123456')
+        cache.set('c', '12345678901')
+        self.assertEqual(cache.get('c'), None)
+        self.assertEqual(cache.stats()['bytes'], 6)
+
+    def test_clear(self):
+        self.cache.set('%s-a' % self.app.config['APP_NAME'], 'a')
+        self.cache.set('other', 'b')
+        self.assertEqual(self.cache.clear(), 1)
+        self.assertEqual(self.cache.get('other'), 'b')
+
+    def test_many(self):
+        self.cache.set_many({'a': 'x', 'b': 'y'})
+        self.assertEqual(self.cache.get_many(['a', 'c', 'b']),
+                         ['x', None, 'y'])
+        self.assertEqual(self.cache.delete_many(['a', 'c']), 1)
+        self.assertEqual(self.cache.get_many(['a', 'b']), [None, 'y'])
+        self.cache.set_json_many({'a': [1, 2], 'b': {'c': 3}})
+        self.assertEqual(self.cache.get_json_many(['a', 'c', 'b']),
+                         [[1, 2], None, {'c': 3}])
+
+    def test_prefetch_cached(self):
+        calls = []
+
+        @cached(timeout=10)
+        def compute(request):
+            calls.append(1)
+            return len(calls)
+
+        request = self.app.wsgi_request(path='/foo')
+        self.assertEqual(prefetch_cached(request, compute), [None])
+        self.assertEqual(compute(request), 1)
+        self.cache.set_json(compute.cache_key(request), 4)
+        self.assertEqual(prefetch_cached(request, compute), [4])
+        self.cache.clear('')
+        self.assertEqual(compute(request), 4)
+        self.assertEqual(len(calls), 1)
+
+    def test_prefetch_cached_stale(self):
+        calls = []
+
+        @cached(timeout=10, stale=10)
+        def compute(request):
+            calls.append(1)
+            return {'calls': len(calls)}
+
+        request = self.app.wsgi_request(path='/foo')
+        self.assertEqual(compute(request), {'calls': 1})
+        request = self.app.wsgi_request(path='/foo')
+        # values are unwrapped as returned by the cached callable
+        self.assertEqual(prefetch_cached(request, compute), [{'calls': 1}])
+        self.assertEqual(compute(request), {'calls': 1})
+        self.assertEqual(len(calls), 1)
+
+    def test_namespace(self):
+        calls = []
+
+        @cached(app=self.app, timeout=10, namespace=('foo', lambda a: 'bla'))
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(compute(), 1)
+        self.assertEqual(compute(), 1)
+        bump_namespace(self.app, 'foo')
+        self.assertEqual(compute(), 2)
+        self.assertEqual(compute(), 2)
+        bump_namespace(self.app, 'bla')
+        self.assertEqual(compute(), 3)
+
+    def test_namespace_generation(self):
+        request = self.app.wsgi_request()
+        gen = namespace_generation(request, 'foo')
+        self.assertTrue(gen > 1)
+        self.assertEqual(namespace_generation(self.app, 'foo'), gen)
+        bump_namespace(self.app, 'foo')
+        # generation read once per request
+        self.assertEqual(namespace_generation(request, 'foo'), gen)
+        self.assertEqual(namespace_generation(self.app, 'foo'), gen + 1)
+        self.assertEqual(bump_namespace(request, 'foo'), gen + 2)
+        self.assertEqual(namespace_generation(request, 'foo'), gen + 2)
+
+    @test.green
+    def test_cached_single_flight(self):
+        calls = []
+
+        @cached(app=self.app, timeout=10)
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        pool = self.app.green_pool
+        key = compute.cache_key(self.app)
+        lock = self.cache.lock('%s:lock' % key, blocking=False)
+        self.assertTrue(lock.acquire())
+        # the waiting caller picks the value computed by the lock holder
+        future = pool.submit(compute)
+        self.cache.set_json(key, 5, timeout=10)
+        lock.release()
+        self.assertEqual(pool.wait(future), 5)
+        self.assertEqual(calls, [])
+
+    @test.green
+    def test_cached_stale(self):
+        calls = []
+
+        @cached(app=self.app, timeout=0.01, stale=10)
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        key = compute.cache_key(self.app)
+        self.assertEqual(compute(), 1)
+        self.assertEqual(compute(), 1)
+        time.sleep(0.02)
+        # a refresh is running elsewhere, the stale value is served
+        lock = self.cache.lock('%s:lock' % key, blocking=False)
+        self.assertTrue(lock.acquire())
+        self.assertEqual(compute(), 1)
+        lock.release()
+        # this caller refreshes
+        self.assertEqual(compute(), 2)
+        self.assertEqual(compute(), 2)
+
+    def test_seconds(self):
+        app = self.application(CACHE_SERVER='memory://',
+                               CACHE_TEST_TIMEOUT='bla',
+                               CACHE_TEST_SECONDS='20')
+        seconds = CacheObject()._seconds
+        self.assertEqual(seconds(app, 5, 10), 5)
+        self.assertEqual(seconds(app, 0.5, 10), 0.5)
+        self.assertEqual(seconds(app, None, 10), 10)
+        self.assertEqual(seconds(app, 'bla', 10), 10)
+        self.assertEqual(seconds(app, 'CACHE_TEST_TIMEOUT', 10), 10)
+        self.assertEqual(seconds(app, 'CACHE_TEST_SECONDS', 10), 20)
+        self.assertEqual(seconds(app, 'CACHE_DEFAULT_TIMEOUT', 10),
+                         app.config['CACHE_DEFAULT_TIMEOUT'])
+
+        @cached(app=app, timeout='CACHE_TEST_TIMEOUT')
+        def compute():
+            return 1
+
+        self.assertEqual(compute(), 1)
+
+
+class TestCacheCodecs(test.TestCase):
+    data = {'name': 'pippo', 'age': 4, 'tags': ['a', 'b']}
+
+    def cache(self, **params):
+        return self.application(CACHE_SERVER='memory://',
+                                **params).cache_server
+
+    def test_json(self):
+        cache = self.cache()
+        cache.set_json('foo', self.data)
+        self.assertEqual(cache.get('foo')[:1], b'\x01')
+        self.assertEqual(cache.get_json('foo'), self.data)
+
+    def test_legacy_json(self):
+        cache = self.cache(CACHE_CODEC='lux.core.cache.Pickle')
+        cache.set('foo', '"bla"')
+        self.assertEqual(cache.get_json('foo'), 'bla')
+        cache.set('foo', b'[1, 2]')
+        self.assertEqual(cache.get_json('foo'), [1, 2])
+
+    def test_pickle(self):
+        cache = self.cache(CACHE_CODEC='lux.core.cache.Pickle')
+        cache.set_json('foo', self.data)
+        self.assertEqual(cache.get_json('foo'), self.data)
+        value = cache.get('foo')
+        cache.set('foo', value[:10] + bytes((value[10] ^ 1,)) + value[11:])
+        self.assertEqual(cache.get_json('foo'), None)
+
+    def test_pickle_reads_json(self):
+        cache = self.cache()
+        cache.set_json('foo', self.data)
+        cache._codec = None
+        cache.config['CACHE_CODEC'] = 'lux.core.cache.Pickle'
+        self.assertEqual(cache.get_json('foo'), self.data)
+
+    @skipUnless(msgpack, 'Requires msgpack')
+    def test_msgpack(self):
+        cache = self.cache(CACHE_CODEC='lux.core.cache.Msgpack')
+        cache.set_json('foo', self.data)
+        self.assertEqual(cache.get('foo')[:1], b'\x02')
+        self.assertEqual(cache.get_json('foo'), self.data)
+
+    def test_compression(self):
+        cache = self.cache(CACHE_COMPRESSION='zlib',
+                           CACHE_COMPRESSION_THRESHOLD=100)
+        cache.set_json('small', self.data)
+        self.assertEqual(cache.get('small')[:1], b'\x01')
+        data = dict(((str(n), n) for n in range(100)))
+        cache.set_json('large', data)
+        self.assertEqual(cache.get('large')[:1], b'\x41')
+        self.assertEqual(cache.get_json('large'), data)
+
+    def test_bad_codec(self):
+        cache = self.cache(CACHE_CODEC='lux.core.cache.Foo')
+        self.assertRaises(ImproperlyConfigured, lambda: cache.codec)
+        cache = self.cache(CACHE_COMPRESSION='foo')
+        self.assertRaises(ImproperlyConfigured, lambda: cache.codec)
+
+
 @skipUnless(REDIS_OK, 'Requires a running Redis server')
 class TestRedisCache(test.AppTestCase, LockTests):
     config_params = {'CACHE_SERVER': redis_cache_server}
@@ -96,6 +363,34 @@ class TestRedisCache(test.AppTestCase, LockTests):
         self.assertEqual(self.cache.set_json(key, data), None)
         self.assertEqual(self.cache.get_json(key), data)
 
+    @test.green
+    def test_many(self):
+        key1, key2 = test.randomname(), test.randomname()
+        self.cache.set_json_many({key1: [1, 2], key2: 'foo'}, timeout=10)
+        self.assertEqual(self.cache.get_json_many([key1, 'xxx', key2]),
+                         [[1, 2], None, 'foo'])
+        self.assertEqual(self.cache.delete_many([key1, key2]), 2)
+        self.assertEqual(self.cache.get_many([key1, key2]), [None, None])
+
+    @test.green
+    def test_clear(self):
+        prefix = test.randomname()
+        self.cache.set_many(dict((('%s%d' % (prefix, n), n)
+                                  for n in range(25))))
+        progress = []
+        result = self.cache.clear(prefix, count=10, progress=progress.append)
+        self.assertEqual(result, 25)
+        self.assertEqual(progress[-1], 25)
+        self.assertEqual(self.cache.get('%s1' % prefix), None)
+        self.assertEqual(self.cache.clear(prefix), 0)
+
+    @test.green
+    def test_hmget(self):
+        key = test.randomname()
+        self.cache.hmset(key, {'name': 'pippo', 'age': '4'})
+        self.assertEqual(self.cache.hmget(key, 'name', 'age'),
+                         [b'pippo', b'4'])
+
     @test.green
     def test_get_json(self):
         self.assertEqual(self.cache.name, 'redis')
@@ -109,3 +404,52 @@ class TestRedisCache(test.AppTestCase, LockTests):
                                        'redis python client'))
 class TestRedisCacheSync(TestRedisCache):
     ClientClass = StrictRedis
+
+
+@skipUnless(REDIS_OK, 'Requires a running Redis server')
+class TestTieredCache(test.AppTestCase, LockTests):
+    config_params = {
+        'CACHE_SERVER': redis_cache_server.replace('redis', 'tiered')
+    }
+
+    def setUp(self):
+        self.cache = self.app.cache_server
+
+    @test.green
+    def test_tiered_cache(self):
+        self.assertEqual(self.cache.name, 'tiered')
+        key = test.randomname()
+        data = {'name': 'pippo', 'age': 4}
+        self.cache.set_json(key, data)
+        self.assertEqual(self.cache.local.get_json(key), data)
+        self.assertEqual(self.cache.remote.get_json(key), data)
+        self.cache.local.delete(key)
+        self.assertEqual(self.cache.get_json(key), data)
+        self.assertEqual(self.cache.local.get_json(key), data)
+        self.cache.delete(key)
+        self.assertEqual(self.cache.get_json(key), None)
+
+    async def test_reader_invalidation(self):
+        app = self.application(PUBSUB_STORE=redis_cache_server)
+        self.assertTrue(app.channels)
+        pool = app.green_pool
+        writer = app.cache_server
+        reader = writer.__class__(app, writer.name, writer.url)
+        key = test.randomname()
+        await pool.submit(writer.set, key, b'foo')
+        # a worker which only reads listens to invalidations
+        value = await pool.submit(reader.get, key)
+        self.assertEqual(value, b'foo')
+        self.assertTrue(reader._registered)
+        await pool.submit(writer.set, key, b'bla')
+        for _ in range(50):
+            if reader.local.get(key) is None:
+                break
+            await asyncio.sleep(0.05)
+        value = await pool.submit(reader.get, key)
+        self.assertEqual(value, b'bla')
+
+    def test_invalidate(self):
+        self.cache.local.set('foo', 'bla')
+        self.cache._on_invalidate('server', 'cache', {'keys': ['foo']})
+        self.assertEqual(self.cache.local.get('foo'), None)
@@ -1,3 +1,6 @@
+from pulsar.apps.wsgi import WsgiResponse
+
+from lux.core import ResponseCache
 from lux.utils import test
 
 
@@ -15,3 +18,149 @@ class TestWrappers(test.TestCase):
         client = test.TestClient(app)
         request, _ = client.request_start_response('get', '/')
         self.assertNotEqual(app.logger, request.logger)
+
+    def test_response_cache(self):
+        app = self.application(CACHE_SERVER='memory://')
+        client = test.TestClient(app)
+        cache = ResponseCache(timeout=60)
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            response = request.response
+            response.content_type = 'application/json'
+            response.content = '{"message": "hello"}'
+            return response
+
+        request, _ = client.request_start_response('get', '/bla')
+        response = cache(handler, request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 1)
+        etag = response.headers.get('etag')
+        self.assertTrue(etag)
+        self.assertTrue(response.headers.get('last-modified'))
+        #
+        request, _ = client.request_start_response('get', '/bla')
+        response = cache(handler, request)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.content), b'{"message": "hello"}')
+        self.assertEqual(response.headers.get('etag'), etag)
+        #
+        request, _ = client.request_start_response(
+            'get', '/bla', headers=[('If-None-Match', etag)])
+        response = cache(handler, request)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers.get('etag'), etag)
+        #
+        request, _ = client.request_start_response(
+            'get', '/bla', params={'template': 'ui'})
+        cache(handler, request)
+        self.assertEqual(len(calls), 2)
+        #
+        request, _ = client.request_start_response('post', '/bla')
+        cache(handler, request)
+        self.assertEqual(len(calls), 3)
+
+    def test_response_cache_not_cached(self):
+        app = self.application(CACHE_SERVER='memory://')
+        client = test.TestClient(app)
+        cache = ResponseCache(timeout=60)
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            response = request.response
+            response.status_code = 404
+            response.content = 'not found'
+            return response
+
+        for _ in range(2):
+            request, _ = client.request_start_response('get', '/bla')
+            response = cache(handler, request)
+            self.assertEqual(response.status_code, 404)
+            self.assertFalse(response.headers.get('etag'))
+        self.assertEqual(len(calls), 2)
+
+    def test_response_cache_session_html(self):
+        app = self.application(CACHE_SERVER='memory://')
+        client = test.TestClient(app)
+        cache = ResponseCache(timeout=60)
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            response = request.response
+            response.content = '<html></html>'
+            return response
+
+        for _ in range(2):
+            request, _ = client.request_start_response('get', '/bla')
+            request.response.content_type = 'text/html'
+            request.cache.session = 'session-id'
+            response = cache(handler, request)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.headers.get('etag'))
+        self.assertEqual(len(calls), 2)
+
+    def test_response_cache_cookies(self):
+        app = self.application(CACHE_SERVER='memory://')
+        client = test.TestClient(app)
+        cache = ResponseCache(timeout=60)
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            response = request.response
+            response.content_type = 'application/json'
+            response.content = '{}'
+            response.set_cookie('session', 'foo')
+            return response
+
+        for _ in range(2):
+            request, _ = client.request_start_response('get', '/bla')
+            response = cache(handler, request)
+            self.assertFalse(response.headers.get('etag'))
+        self.assertEqual(len(calls), 2)
+
+    def test_response_cache_headers(self):
+        app = self.application(CACHE_SERVER='memory://')
+        client = test.TestClient(app)
+        cache = ResponseCache(timeout=60)
+
+        def handler(request):
+            response = request.response
+            response.content_type = 'application/json'
+            response.content = '{}'
+            response['Vary'] = 'Accept-Encoding'
+            response['Cache-Control'] = 'max-age=60'
+            return response
+
+        request, _ = client.request_start_response('get', '/bla')
+        cache(handler, request)
+        request, _ = client.request_start_response('get', '/bla')
+        response = cache(handler, request)
+        self.assertEqual(response.headers.get('vary'), 'Accept-Encoding')
+        self.assertEqual(response.headers.get('cache-control'), 'max-age=60')
+
+    def test_response_cache_store_not_modified(self):
+        app = self.application(CACHE_SERVER='memory://')
+        client = test.TestClient(app)
+        cache = ResponseCache(timeout=60)
+        responses = []
+
+        def handler(request):
+            response = WsgiResponse(content_type='application/json',
+                                    content='{}')
+            response['X-Handler'] = 'yes'
+            responses.append(response)
+            return response
+
+        request, _ = client.request_start_response(
+            'get', '/bla', headers=[('If-None-Match', '*')])
+        response = cache(handler, request)
+        self.assertIs(response, responses[0])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers.get('x-handler'), 'yes')
+        self.assertTrue(response.headers.get('etag'))
@@ -1,3 +1,4 @@
+import time
 from binascii import unhexlify, a2b_hex as _a2b_hex
 
 from lux.utils import test
@@ -5,7 +6,8 @@ from lux.core import PasswordMixin
 from lux.utils.crypt.pbkdf2 import (_0xffffffffL, algorithms,
                                     isbytes, isinteger, callable, binxor,
                                     b64encode, verify, b2a_hex, PBKDF2,
-                                    crypt, _makesalt, encrypt,
+                                    crypt, _makesalt, encrypt, pbkdf2,
+                                    needs_rehash,
                                     sha1, sha256, sha512)
 
 
@@ -397,3 +399,44 @@ class TestPBKDF2(test.TestCase):
         psw = mixin.encrypt(raw)
         self.assertNotEqual(raw, psw)
         self.assertTrue(mixin.crypt_verify(psw, raw))
+
+    def test_hashlib_pbkdf2(self):
+        for digestmodule in algorithms.values():
+            for secret_key in (None, '123'):
+                expected = PBKDF2('test', 'salt', 50, digestmodule,
+                                  secret_key=secret_key).read(40)
+                result = pbkdf2('test', 'salt', 50, digestmodule().name,
+                                secret_key=secret_key, dklen=40)
+                self.assertEqual(result, expected)
+
+    def test_needs_rehash(self):
+        result = crypt('test', iterations=100)
+        self.assertFalse(needs_rehash(result, 100))
+        self.assertFalse(needs_rehash(self.u(result), 100))
+        self.assertTrue(needs_rehash(result, 200))
+        self.assertTrue(needs_rehash(result, 100, sha512))
+        self.assertTrue(needs_rehash('$p5k2$sha256$xx$salt$hash', 100))
+        self.assertTrue(needs_rehash('plain', 100))
+
+    def test_password_mixin_rehash(self):
+        app = self.application()
+        mixin = PasswordMixin()
+        mixin.on_config(app)
+        psw = mixin.encrypt('test')
+        self.assertFalse(mixin.crypt_needs_rehash(psw))
+        mixin.ckwargs['iterations'] = 20
+        self.assertTrue(mixin.crypt_needs_rehash(psw))
+        self.assertTrue(mixin.crypt_verify(psw, 'test'))
+        psw = mixin.encrypt('test')
+        self.assertFalse(mixin.crypt_needs_rehash(psw))
+
+    def test_benchmark(self):
+        iterations = 2000
+        start = time.perf_counter()
+        expected = PBKDF2('test', 'salt', iterations, sha256).read(32)
+        python_time = time.perf_counter() - start
+        start = time.perf_counter()
+        result = pbkdf2('test', 'salt', iterations, 'sha256', dklen=32)
+        hashlib_time = time.perf_counter() - start
+        self.assertEqual(result, expected)
+        self.assertLess(hashlib_time, python_time)
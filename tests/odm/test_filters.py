@@ -1,7 +1,20 @@
-from unittest.mock import MagicMock
+import csv
+import json
+import asyncio
+from io import StringIO
+from inspect import isawaitable
+from unittest.mock import MagicMock, patch
+from urllib.parse import urlparse
+
+from pulsar.apps.wsgi.utils import query_dict
 
 from lux.utils import test
+from lux.extensions.rest import CursorPagination
+from lux.extensions.rest.views.export import (
+    NdjsonWriter, export_chunks, green_chunks
+)
 
+from tests.odm import TestEnum
 from tests.odm.utils import SqliteMixin, OdmUtils
 
 
@@ -125,6 +138,142 @@ class TestFiltersPsql(OdmUtils, test.AppTestCase):
         self.assertTrue(instance)
         self.assertEqual(logger.error.called, 1)
 
+    async def test_export(self):
+        request = await self.client.get('/tasks?done=1',
+                                        HTTP_ACCEPT='application/x-ndjson')
+        response = request.response
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content_type, 'application/x-ndjson')
+        body = await self._streamed(response)
+        tasks = [json.loads(line) for line in body.splitlines()]
+        self.assertTrue(tasks)
+        for task in tasks:
+            self.assertEqual(task['done'], True)
+        #
+        request = await self.client.get('/tasks', HTTP_ACCEPT='text/csv')
+        response = request.response
+        self.assertEqual(response.content_type, 'text/csv')
+        rows = list(csv.reader(StringIO(await self._streamed(response))))
+        self.assertTrue('id' in rows[0])
+        self.assertTrue('subject' in rows[0])
+        self.assertTrue(len(rows) > len(tasks))
+        for row in rows[1:]:
+            self.assertEqual(len(row), len(rows[0]))
+
+    async def test_export_close(self):
+        closed = []
+
+        def rows():
+            try:
+                for i in range(10):
+                    yield {'id': i}
+            finally:
+                closed.append(True)
+
+        request = self.app.wsgi_request()
+        chunks = export_chunks(request, NdjsonWriter(['id']), rows(), 2)
+        self.assertEqual(next(chunks), b'{"id":0}\n{"id":1}\n')
+        chunks.close()
+        self.assertEqual(closed, [True])
+        #
+        # client disconnecting from a response produced in the green pool
+        pool = self.app.green_pool
+        chunks = export_chunks(request, NdjsonWriter(['id']), rows(), 2)
+        content = green_chunks(pool, chunks)
+        chunk = await next(content)
+        self.assertEqual(chunk, b'{"id":0}\n{"id":1}\n')
+        # as done by WsgiResponse.close
+        content.close()
+        for _ in range(50):
+            if len(closed) == 2:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(closed, [True, True])
+
+    async def _streamed(self, response):
+        chunks = []
+        for chunk in response.content:
+            if isawaitable(chunk):
+                chunk = await chunk
+            chunks.append(chunk)
+        return b''.join(chunks).decode('utf-8')
+
+    @test.green
+    def test_estimate_count_enum(self):
+        request = self.app.wsgi_request()
+        model = self.app.models['tasks']
+        task = self.app.odm().task
+        with model.session(request) as session:
+            query = model.query(request, session,
+                                task.enum_field == TestEnum.opt1)
+            total = query.estimate_count()
+            self.assertTrue(total is None or total > 0)
+            count = query.count()
+            self.assertTrue(count)
+            self.assertEqual(model.query_count(request, query, 'estimated'),
+                             total or count)
+            #
+            # errors fall back to the exact count
+            with patch.object(type(query), '_estimate',
+                              side_effect=ValueError):
+                self.assertEqual(query.estimate_count(), None)
+                self.assertEqual(
+                    model.query_count(request, query, 'estimated'), count)
+
+    def test_cursor_pagination(self):
+        request = self.app.wsgi_request()
+        model = self.app.models['tasks']
+        model.pagination = pagination = CursorPagination()
+        try:
+            data = model.query_data(request, limit=100)
+            ids = [task['id'] for task in data['result']]
+            self.assertTrue(len(ids) > 1)
+            self.assertEqual(ids, sorted(ids))
+            self.assertFalse('next' in data)
+            self.assertFalse('total' in data)
+            #
+            pages, data = self._cursor_pages(model, request)
+            self.assertEqual(pages, ids)
+            self.assertTrue('prev' in data)
+            #
+            cursor = pagination.encode_cursor([ids[-1]], True)
+            data = model.query_data(request, limit=1, cursor=cursor)
+            self.assertEqual(data['result'][0]['id'], ids[-2])
+            self.assertTrue('next' in data)
+            #
+            # datetime and nullable sort columns
+            for sortby in ('created', 'created:desc', 'desc', 'desc:desc'):
+                data = model.query_data(request, limit=100, sortby=sortby)
+                expected = [task['id'] for task in data['result']]
+                self.assertEqual(sorted(expected), ids)
+                pages, data = self._cursor_pages(model, request,
+                                                 sortby=sortby)
+                self.assertEqual(pages, expected)
+                pages, _ = self._cursor_pages(model, request, data,
+                                              'prev', sortby=sortby)
+                self.assertEqual(pages, expected[-2::-1])
+            #
+            data = model.query_data(request, limit=100, sortby='id:desc')
+            self.assertEqual([task['id'] for task in data['result']],
+                             list(reversed(ids)))
+        finally:
+            model.pagination = None
+
+    def _cursor_pages(self, model, request, data=None, link='next',
+                      **params):
+        """Follow ``link`` urls of cursor paginated responses
+        """
+        pages = []
+        while True:
+            cursor = None
+            if data:
+                if link not in data:
+                    return pages, data
+                cursor = query_dict(urlparse(data[link]).query)['cursor']
+            data = model.query_data(request, limit=1, cursor=cursor,
+                                    **params)
+            pages.extend((task['id'] for task in data['result']))
+
 
 class TestFiltersSqlite(SqliteMixin, TestFiltersPsql):
 
@@ -1,9 +1,13 @@
 from urllib.parse import urlsplit
 
+from sqlalchemy import text
+
 from pulsar import ImproperlyConfigured
 
 from lux.utils import test
 from lux.extensions.rest import DictModel
+from lux.extensions.odm import SqlStats
+from lux.extensions.odm.instrument import sql_stats
 
 from tests.odm.utils import OdmUtils
 
@@ -25,3 +29,105 @@ class TestModels(OdmUtils, test.AppTestCase):
         request = self.app.wsgi_request()
         url = users.api_url(request)
         self.assertTrue(urlsplit(url).path, '/users')
+
+    def test_json_serializer(self):
+        tasks = self.app.models['tasks']
+        serializer = tasks.json_serializer(in_list=True)
+        self.assertIs(tasks.json_serializer(in_list=True), serializer)
+        self.assertIsNot(tasks.json_serializer(), serializer)
+        self.assertIsNot(tasks.json_serializer(in_list=True,
+                                               exclude=['desc']),
+                         serializer)
+        request = self.app.wsgi_request()
+        with tasks.session(request) as session:
+            query = tasks.query(request, session)
+            data = query.tojson(request)
+            self.assertTrue(data)
+            for task in data:
+                self.assertIsInstance(task['id'], int)
+                self.assertIn(task['enum_field'], ('opt1', 'opt2'))
+                self.assertTrue(task['created'].endswith('+00:00'))
+            data = tasks.tojson(request, query.all()[0], exclude=['done'])
+            self.assertFalse('done' in data)
+
+    def test_json_serializer_bounded(self):
+        tasks = self.app.models['tasks']
+        serializer = tasks.json_serializer(fields=['id'])
+        for i in range(tasks.plans_size + 10):
+            tasks.json_serializer(fields=['id', 'field%d' % i])
+            tasks.eager_load(['id', 'field%d' % i])
+        self.assertEqual(len(tasks._serializers), tasks.plans_size)
+        self.assertEqual(len(tasks._eager_loads), tasks.plans_size)
+        self.assertIsNot(tasks.json_serializer(fields=['id']), serializer)
+
+    def test_eager_load(self):
+        tasks = self.app.models['tasks']
+        options = tasks.eager_load()
+        self.assertEqual(len(options), 1)
+        self.assertIs(tasks.eager_load(), options)
+        self.assertEqual(tasks.eager_load(['id', 'subject']), [])
+        self.assertEqual(len(tasks.eager_load(['id', 'assigned'])), 1)
+
+    def test_id_repr_cache(self):
+        tasks = self.app.models['tasks']
+        people = self.app.models['people']
+        request = self.app.wsgi_request()
+        with tasks.session(request) as session:
+            person = people.db_model()(username=test.randomname(),
+                                       name='luca')
+            session.add(person)
+            session.add(tasks.db_model()(subject='An assigned task',
+                                         assigned=person))
+        with tasks.session(request) as session:
+            data = tasks.query(request, session).tojson(request)
+            self.assertTrue(data)
+            objs = [o.obj for o in tasks.query(request, session).all()]
+            assigned = [o.assigned for o in objs if o.assigned]
+            self.assertTrue(assigned)
+            reprs = request.cache.id_reprs
+            self.assertTrue(reprs)
+            data = people.id_repr(request, assigned[0])
+            self.assertEqual(data['id'], assigned[0].id)
+            data['foo'] = 'bar'
+            data = people.id_repr(request, assigned[0])
+            self.assertFalse('foo' in data)
+            request.cache.id_reprs = None
+            self.assertEqual(people.id_repr(request, assigned[0]), data)
+            self.assertEqual(people.id_repr(request, assigned[0], False),
+                             people._id_repr(request, assigned[0], False))
+
+    def test_iter_batch(self):
+        tasks = self.app.models['tasks']
+        request = self.app.wsgi_request()
+        with tasks.session(request) as session:
+            ids = [o.obj.id for o in tasks.query(request, session).all()]
+            self.assertTrue(ids)
+            query = tasks.query(request, session).sortby('id')
+            self.assertEqual([o.obj.id for o in query.iter(batch=2)],
+                             sorted(ids))
+
+    def test_sql_stats(self):
+        tasks = self.app.models['tasks']
+        request = self.app.wsgi_request()
+        request.cache.sql_stats = stats = SqlStats(request.path)
+        with tasks.session(request) as session:
+            tasks.query(request, session).all()
+            tasks.query(request, session).all()
+            engine = session.get_bind(tasks.db_model())
+        self.assertTrue(stats.count >= 2)
+        # pooled connections are detached from the request statistics
+        count = stats.count
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+        self.assertEqual(stats.count, count)
+        self.assertTrue(stats.time > 0)
+        self.assertTrue(stats.slowest)
+        self.assertTrue(stats.duplicates())
+        self.assertTrue(stats.server_timing().startswith('db;dur='))
+        data = stats.tojson()
+        self.assertEqual(data['count'], stats.count)
+        #
+        # requests are not sampled by default
+        request = self.app.wsgi_request()
+        self.assertEqual(sql_stats(request), None)
+        self.assertIs(request.cache.sql_stats, False)
@@ -1,3 +1,5 @@
+from unittest import mock
+
 from dateutil.parser import parse
 
 from lux.utils import test
@@ -47,6 +49,21 @@ class TestPostgreSql(OdmUtils, test.AppTestCase):
         self.assertEqual(user.first_name, 'Luca')
         self.assertFalse(user.is_superuser())
 
+    @test.green
+    def test_cache_namespace_bump(self):
+        app = self.app
+        odm = app.odm()
+        request = app.wsgi_request()
+        with mock.patch('lux.extensions.odm.bump_namespace') as bump:
+            with odm.begin(request=request) as session:
+                session.add(odm.user(first_name='Pippo'))
+            self.assertFalse(bump.called)
+            with mock.patch.dict(app.config,
+                                 {'DATABASE_CACHE_NAMESPACES': True}):
+                with odm.begin(request=request) as session:
+                    session.add(odm.user(first_name='Pluto'))
+        bump.assert_called_once_with(request, 'models:users')
+
     async def test_get_tasks(self):
         request = await self.client.get(self.api_url('tasks'))
         response = request.response
@@ -121,6 +138,70 @@ class TestPostgreSql(OdmUtils, test.AppTestCase):
         request = await self.client.get(url)
         self.json(request.response, 404)
 
+    async def test_bulk(self):
+        task1 = await self._create_task(self.super_token, 'A bulk update')
+        task2 = await self._create_task(self.super_token, 'A bulk delete')
+        url = self.api_url('tasks/_bulk')
+        items = [{'data': {'subject': 'A bulk create'}},
+                 {'id': task1['id'], 'data': {'done': True}},
+                 {'action': 'delete', 'id': task2['id']}]
+        request = await self.client.post(url, json=items)
+        self.json(request.response, 401)
+        #
+        # Invalid items, nothing is changed
+        request = await self.client.post(
+            url,
+            json=items + [{'action': 'foo'}, {'id': 999999}],
+            token=self.super_token
+        )
+        data = self.json(request.response, 422)
+        result = data['result']
+        self.assertEqual(len(result), 5)
+        self.assertEqual(result[:3], [None, None, None])
+        self.assertTrue(result[3]['error'])
+        self.assertTrue(result[4]['error'])
+        request = await self.client.get(self.api_url('tasks/%d' % task2['id']))
+        self.json(request.response, 200)
+        #
+        request = await self.client.post(url, json=items,
+                                         token=self.super_token)
+        result = self.json(request.response, 200)['result']
+        self.assertEqual(len(result), 3)
+        self.assertEqual(result[0]['subject'], 'A bulk create')
+        self.assertEqual(result[1]['id'], task1['id'])
+        self.assertEqual(result[1]['done'], True)
+        self.assertEqual(result[2], {'id': task2['id']})
+        request = await self.client.get(self.api_url('tasks/%d' % task2['id']))
+        self.json(request.response, 404)
+        #
+        request = await self.client.post(url, json={}, token=self.super_token)
+        self.json(request.response, 400)
+
+    async def test_bulk_unauthorized(self):
+        task = await self._create_task(self.super_token, 'A bulk 401')
+        url = self.api_url('tasks/_bulk')
+        items = [{'id': task['id'], 'data': {'done': True}},
+                 {'action': 'delete', 'id': task['id']}]
+        request = await self.client.post(url, json=items)
+        self.check401(request.response)
+        request = await self.client.get(self.api_url('tasks/%d' % task['id']))
+        data = self.json(request.response, 200)
+        self.assertEqual(data['done'], False)
+
+    async def test_bulk_integrity_error(self):
+        url = self.api_url('people/_bulk')
+        items = [{'data': {'username': 'bulkdup', 'name': 'luca'}},
+                 {'data': {'username': 'bulkdup', 'name': 'pippo'}}]
+        request = await self.client.post(url, json=items,
+                                         token=self.super_token)
+        data = self.json(request.response, 422)
+        self.assertTrue(data['error'])
+        self.assertEqual(data['message'], 'Could not update models')
+        request = await self.client.get(
+            self.api_url('people?username=bulkdup'), token=self.super_token)
+        data = self.json(request.response, 200)
+        self.assertEqual(data['result'], [])
+
     async def test_sortby(self):
         await self._create_task(self.super_token, 'We want to sort 1')
         await self._create_task(self.super_token, 'We want to sort 2')
@@ -1,5 +1,9 @@
+from unittest import mock
+
+from pulsar import BadRequest
+
 from lux.utils import test
-from lux.extensions.rest import DictModel
+from lux.extensions.rest import DictModel, Query
 
 
 class TestDictModel(test.TestCase):
@@ -28,3 +32,129 @@ class TestDictModel(test.TestCase):
         model.set_instance_value(o, 'name', None)
         data = model.tojson(request, o)
         self.assertEqual(len(data), 1)
+
+    def test_query_count(self):
+        model = DictModel('test', fields=('id', 'foo', 'name'))
+        app = self.application(CACHE_SERVER='memory://',
+                               API_COUNT_CACHE_TIMEOUT=10)
+        app.models.register(model)
+        request = app.wsgi_request()
+        query = mock.MagicMock()
+        query.count.return_value = 20
+        query.estimate_count.return_value = 18
+        query.count_key.return_value = 'SELECT foo'
+        self.assertEqual(model.query_count(request, query), 20)
+        self.assertEqual(model.query_count(request, query), 20)
+        self.assertEqual(query.count.call_count, 1)
+        self.assertEqual(model.query_count(request, query, 'estimated'), 18)
+        self.assertEqual(model.query_count(request, query, 'none'), None)
+        query.estimate_count.return_value = None
+        self.assertEqual(model.query_count(request, query, 'estimated'), 20)
+        self.assertRaises(BadRequest, model.query_count, request, query, 'x')
+        model.count_policy = 'none'
+        self.assertEqual(model.query_count(request, query), None)
+
+    def test_query(self):
+        data = [{'id': i, 'foo': i % 3, 'name': 'ab'[i % 2]}
+                for i in range(10)]
+        data[4]['foo'] = None
+
+        class TestQuery(Query):
+
+            def _get_data(self):
+                return data
+
+        model = DictModel('test', fields=('id', 'foo', 'name'))
+        app = self.application()
+        app.models.register(model)
+        request = app.wsgi_request()
+        #
+        query = TestQuery(model, request)
+        query.filter(name='a').sortby(['foo:desc', 'id'])
+        result = [(o.obj['id'], o.obj['foo']) for o in query.all()]
+        self.assertEqual(result, [(2, 2), (8, 2), (0, 0), (6, 0), (4, None)])
+        self.assertEqual(query.count(), 5)
+        query.offset(1).limit(2)
+        self.assertEqual([o.obj['id'] for o in query.all()], [8, 0])
+        #
+        query = TestQuery(model, request).filter(**{'foo:ge': 1})
+        self.assertEqual([o.obj['id'] for o in query.all()], [1, 2, 5, 7, 8])
+        query = TestQuery(model, request).filter(id=[3, 5, 11])
+        self.assertEqual([o.obj['id'] for o in query.all()], [3, 5])
+        #
+        query = TestQuery(model, request)
+        query.seek([('foo', 'asc'), ('id', 'desc')], [1, 7])
+        self.assertEqual([o.obj['id'] for o in query.all()], [1, 8, 5, 2, 4])
+        query = TestQuery(model, request).seek([('id', 'asc')], [7], True)
+        self.assertEqual([o.obj['id'] for o in query.limit(2).all()], [6, 5])
+
+    def test_indexes(self):
+        data = [{'id': i, 'foo': i % 3, 'name': 'ab'[i % 2]}
+                for i in range(10)]
+        data[4]['foo'] = None
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return data
+
+        class TestQuery(Query):
+
+            def dataset_key(self):
+                return 'test'
+
+            def _get_data(self):
+                return loader()
+
+        model = DictModel('test', fields=('id', 'foo', 'name'),
+                          indexes={'name': 'hash', 'foo': 'sorted'})
+        app = self.application()
+        app.models.register(model)
+        request = app.wsgi_request()
+        dataset = model.dataset('test', loader)
+        self.assertEqual(set(dataset.indexes), set(('name', 'foo')))
+        self.assertIs(model.dataset('test', loader), dataset)
+        self.assertEqual(len(loads), 1)
+        #
+        query = TestQuery(model, request).filter(name='a')
+        self.assertEqual([o.obj['id'] for o in query.all()], [0, 2, 4, 6, 8])
+        query = TestQuery(model, request).filter(name=['a', 'b'], foo=2)
+        self.assertEqual([o.obj['id'] for o in query.all()], [2, 5, 8])
+        query = TestQuery(model, request).filter(**{'foo:gt': 0,
+                                                    'name': 'a'})
+        self.assertEqual([o.obj['id'] for o in query.all()], [2, 8])
+        query = TestQuery(model, request).filter(**{'foo:le': 1,
+                                                    'id:ne': 0})
+        self.assertEqual([o.obj['id'] for o in query.all()], [1, 3, 6, 7, 9])
+        #
+        model.refresh()
+        self.assertIsNot(model.dataset('test', loader), dataset)
+        self.assertEqual(len(loads), 2)
+        dataset = model.dataset('test', loader, version=1)
+        self.assertEqual(len(loads), 3)
+        self.assertIs(model.dataset('test', loader, version=1), dataset)
+        self.assertEqual(len(loads), 3)
+
+    def test_query_iter(self):
+        data = [{'id': i, 'name': 'ab'[i % 2]} for i in range(100)]
+
+        class TestQuery(Query):
+
+            def _get_data(self):
+                return data
+
+        model = DictModel('test', fields=('id', 'foo', 'name'))
+        app = self.application()
+        app.models.register(model)
+        request = app.wsgi_request()
+        query = TestQuery(model, request).sortby('id:desc').offset(10)
+        with mock.patch.object(model, 'instance',
+                               wraps=model.instance) as instance:
+            result = query.limit(3).iter()
+            self.assertEqual(instance.call_count, 0)
+            self.assertEqual(next(result).obj['id'], 89)
+            self.assertEqual(instance.call_count, 1)
+            self.assertEqual([o.obj['id'] for o in result], [88, 87])
+            self.assertEqual(instance.call_count, 3)
+        self.assertEqual(list(query.iter_json(request)),
+                         [data[89], data[88], data[87]])
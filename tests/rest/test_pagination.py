@@ -1,9 +1,12 @@
+from datetime import datetime, timedelta
 from urllib.parse import urlparse
 
+from pulsar import BadRequest
 from pulsar.apps.wsgi.utils import query_dict
 
 from lux.utils import test
-from lux.extensions.rest import Pagination
+from lux.extensions.rest import (Pagination, CursorPagination, DictModel,
+                                 RestField, Query)
 
 
 class TestUtils(test.TestCase):
@@ -60,3 +63,90 @@ class TestUtils(test.TestCase):
         query = query_dict(urlparse(pag['prev']).query)
         self.assertEqual(query['offset'], '17')
         self.assertEqual(query['limit'], '5')
+
+    def test_cursor(self):
+        app = self.application()
+        request = app.wsgi_request()
+        pagination = CursorPagination()
+        cursor = pagination.encode_cursor(['foo', 5])
+        self.assertEqual(pagination.decode_cursor(cursor, 2),
+                         (['foo', 5], False))
+        cursor = pagination.encode_cursor(['foo', 5], True)
+        self.assertEqual(pagination.decode_cursor(cursor, 2),
+                         (['foo', 5], True))
+        self.assertEqual(pagination.decode_cursor(None, 2), None)
+        self.assertRaises(BadRequest, pagination.decode_cursor, cursor, 1)
+        self.assertRaises(BadRequest, pagination.decode_cursor, 'xyz', 1)
+        #
+        pag = pagination(request, [], limit=25, next=cursor)
+        self.assertFalse('total' in pag)
+        self.assertFalse('prev' in pag)
+        query = query_dict(urlparse(pag['next']).query)
+        self.assertEqual(query['cursor'], cursor)
+        self.assertEqual(query['limit'], '25')
+        pag = pagination(request, [1, 2])
+        self.assertEqual(pag['total'], 2)
+
+    def test_cursor_links(self):
+        start = datetime(2016, 1, 1)
+        data = [{'id': i, 'date': start + timedelta(hours=i % 4)}
+                for i in range(9)]
+        data[5]['date'] = None
+
+        class TestQuery(Query):
+
+            def _get_data(self):
+                return data
+
+        class TestModel(DictModel):
+
+            def get_query(self, session):
+                return TestQuery(self, session.request)
+
+        model = TestModel('test', fields=('id', RestField('date',
+                                                          sortable=True)))
+        model.pagination = CursorPagination()
+        app = self.application()
+        app.models.register(model)
+        request = app.wsgi_request()
+        for sortby in ('date', 'date:desc'):
+            result = model.query_data(request, limit=100, sortby=sortby)
+            ids = [o['id'] for o in result['result']]
+            self.assertEqual(sorted(ids), list(range(9)))
+            # null values are last
+            self.assertEqual(ids[-1], 5)
+            pages = []
+            result = model.query_data(request, limit=2, sortby=sortby)
+            while True:
+                pages.extend((o['id'] for o in result['result']))
+                if 'next' not in result:
+                    break
+                cursor = query_dict(urlparse(result['next']).query)['cursor']
+                result = model.query_data(request, limit=2, sortby=sortby,
+                                          cursor=cursor)
+            self.assertEqual(pages, ids)
+            pages = []
+            while 'prev' in result:
+                cursor = query_dict(urlparse(result['prev']).query)['cursor']
+                result = model.query_data(request, limit=2, sortby=sortby,
+                                          cursor=cursor)
+                pages[:0] = [o['id'] for o in result['result']]
+            self.assertEqual(pages, ids[:len(pages)])
+            self.assertEqual(len(pages), 8)
+
+    def test_unknown_total(self):
+        app = self.application()
+        request = app.wsgi_request()
+        pagination = Pagination()
+        #
+        pag = pagination(request, list(range(25)), None, 25, 50)
+        self.assertFalse('total' in pag)
+        self.assertFalse('last' in pag)
+        query = query_dict(urlparse(pag['next']).query)
+        self.assertEqual(query['offset'], '75')
+        query = query_dict(urlparse(pag['prev']).query)
+        self.assertEqual(query['offset'], '25')
+        #
+        pag = pagination(request, list(range(10)), None, 25, 50)
+        self.assertFalse('next' in pag)
+        self.assertFalse('last' in pag)
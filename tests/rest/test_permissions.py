@@ -0,0 +1,51 @@
+from lux.utils import test
+from lux.extensions.rest.permissions import has_permission, compile_policies
+
+
+class TestPolicyEngine(test.TestCase):
+    config_file = 'tests.rest'
+
+    policies = [
+        {'resource': 'tasks', 'action': '*'},
+        {'resource': 'tasks:secret', 'action': 'read', 'effect': 'deny'},
+        {'resource': 'tasks:*', 'action': ['read', 'update'],
+         'condition': "match[0] != 'private'"},
+        {'resource': 'people:*:name', 'action': 'read'}
+    ]
+
+    def test_has_permission(self):
+        request = self.application().wsgi_request()
+        policies = self.policies
+        self.assertTrue(has_permission(request, policies, 'tasks', 'read'))
+        self.assertTrue(has_permission(request, policies, 'tasks', 'DELETE'))
+        self.assertTrue(has_permission(request, policies, 'tasks:subject',
+                                       'read'))
+        self.assertFalse(has_permission(request, policies, 'tasks:secret',
+                                        'read'))
+        # falls back to the tasks resource
+        self.assertTrue(has_permission(request, policies, 'tasks:private',
+                                       'read'))
+        self.assertTrue(has_permission(request, policies, 'people:1:name',
+                                       'read'))
+        self.assertFalse(has_permission(request, policies, 'people:1',
+                                        'read'))
+        self.assertFalse(has_permission(request, policies, 'people:1:name',
+                                        'update'))
+
+    def test_invalid_condition(self):
+        request = self.application().wsgi_request()
+        policies = [{'resource': 'tasks', 'action': 'read',
+                     'condition': 'user.'}]
+        self.assertFalse(has_permission(request, policies, 'tasks', 'read'))
+
+    def test_get_permissions(self):
+        request = self.application().wsgi_request()
+        engine = compile_policies(self.policies)
+        self.assertIs(compile_policies(list(self.policies)), engine)
+        perms = engine.get_permissions(request,
+                                       ['tasks:secret', 'tasks:subject'],
+                                       ['read', 'update'])
+        self.assertEqual(perms, {
+            'tasks:secret': {'read': False, 'update': True},
+            'tasks:subject': {'read': True, 'update': True}
+        })
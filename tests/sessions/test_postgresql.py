@@ -1,5 +1,13 @@
 """Test sessions backend with PostgreSql"""
+from unittest import mock
+
 from lux.utils import test
+from lux.core.cache import create_cache
+from lux.extensions.sessions.browser import (session_user_key,
+                                             session_user_namespace)
+from lux.core.cache import namespace_generation
+
+from tests.config import redis_cache_server
 
 
 class TestPostgreSql(test.AppTestCase):
@@ -157,3 +165,66 @@ class TestPostgreSql(test.AppTestCase):
         cookie2 = self.cookie(response)
         self.assertTrue(cookie2)
         self.assertNotEqual(cookie, cookie2)
+
+    async def test_session_user_cache(self):
+        cache = create_cache(self.app, 'memory://')
+        # users are cached only when invalidations are received
+        with mock.patch.object(self.app, 'cache_server', cache), \
+                mock.patch.object(self.app, 'channels', mock.MagicMock()):
+            cookie = await self.test_create_superuser_command_and_login()
+            request = await self.client.get('/', cookie=cookie)
+            response = request.response
+            self.assertEqual(response.status_code, 200)
+            key = session_user_key(self.app, request.cache.session.token)
+            data = cache.get_json(key)
+            self.assertTrue(data['user'])
+            self.assertTrue(data['generation'])
+            #
+            request = await self.client.get('/', cookie=cookie)
+            self.assertTrue(request.cache.user.is_authenticated())
+            token = self.authenticity_token(self.bs(request.response))
+            request = await self.client.post('/logout',
+                                             json=token,
+                                             cookie=cookie)
+            self.assertEqual(request.response.status_code, 200)
+            self.assertEqual(cache.get_json(key), None)
+
+    async def test_session_user_bulk_invalidation(self):
+        app = self.app
+        backend = app.auth_backend.backends[0]
+        cache = create_cache(app, 'memory://')
+        with mock.patch.object(app, 'cache_server', cache):
+            key = session_user_key(app, 'token1')
+            cache.set_json(key, {'user': {'id': 1}})
+            await backend._token_changed(app, 'models', 'tokens.bulk',
+                                         {'update': [{'id': 'token2'}],
+                                          'delete': [{'id': 'token1'}]})
+            self.assertEqual(cache.get_json(key), None)
+            namespace = session_user_namespace(5)
+            generation = namespace_generation(app, namespace)
+            await backend._user_changed(app, 'models', 'users.bulk',
+                                        {'update': [{'id': 5}]})
+            self.assertNotEqual(namespace_generation(app, namespace),
+                                generation)
+
+    async def test_session_user_invalidation_redis(self):
+        # channel callbacks run on the event loop, where redis
+        # operations are coroutines
+        app = self.app
+        pool = app.green_pool
+        backend = app.auth_backend.backends[0]
+        cache = create_cache(app, redis_cache_server)
+        with mock.patch.object(app, 'cache_server', cache):
+            token = test.randomname()
+            key = session_user_key(app, token)
+            await pool.submit(cache.set_json, key, {'user': {'id': 1}})
+            await backend._token_changed(app, 'models', 'tokens.delete',
+                                         {'id': token})
+            self.assertEqual(await pool.submit(cache.get_json, key), None)
+            namespace = session_user_namespace(token)
+            generation = await pool.submit(namespace_generation, app,
+                                           namespace)
+            await backend._user_changed(app, 'models', 'users.update',
+                                        {'id': token})
+            value = await pool.submit(namespace_generation, app, namespace)
+            self.assertNotEqual(value, generation)